@@ -1,19 +1,32 @@
-from flask import Flask, redirect, request, jsonify, session
-from gmail_utils import get_gmail_service
-from extractor import extract_event_details, is_event_like, count_event_fields
+from flask import Flask, Response, redirect, request, jsonify, session, stream_with_context
+from gmail_utils import get_gmail_service, build_gmail_service, fetch_messages, sync_message_ids, GMAIL_SYNC_MODE, GMAIL_BATCH_SIZE
+from extractor import extract_event_details, extract_event_details_deferred, resolve_deferred, is_event_like, count_event_fields, looks_event_related, EXTRACTOR_VERSION
 from flask_cors import CORS
 import os
-from db_utils import save_to_db
+from db_utils import init_db, close_connection, delete_expired_events, save_events, get_history_id, set_history_id, get_retry_message_ids, get_events_by_message_ids, iter_events
+from cache_utils import cache_from_env
+from jobs import JobRegistry
+from extraction_pool import Deadline, LLM_REQUEST_BUDGET_SECONDS, map_ordered
+from mime_parts import scan_payload
+from ics_events import extract_ics_events
+import hf_client
+import metrics
+import ner_local
+from hf_client import HF_NER_BATCH_SIZE
 import requests
 import logging
 import base64
-import re
+import calendar
+import hashlib
+import json
+import threading
+import time
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
-from icalendar import Calendar
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import partial
+from typing import Callable, Iterator, Optional, Tuple
 
 app = Flask(__name__)
 app.secret_key = "super_secret"
@@ -38,101 +51,148 @@ CORS(
 )
 
 all_events = []
-PROCESSED_CACHE = {}
-# ---- Helpers to extract readable body text from Gmail payload ----
-def _decode_base64_to_text(data: str) -> str:
-    try:
-        return base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
-    except Exception:
-        return ""
-
-def _strip_html(html: str) -> str:
-    if not html:
-        return ""
-    # Remove script/style
-    html = re.sub(r"<script[\s\S]*?</script>", " ", html, flags=re.IGNORECASE)
-    html = re.sub(r"<style[\s\S]*?</style>", " ", html, flags=re.IGNORECASE)
-    # Replace breaks with newlines
-    html = re.sub(r"<(br|/p|/div)>", "\n", html, flags=re.IGNORECASE)
-    # Strip tags
-    text = re.sub(r"<[^>]+>", " ", html)
-    # Collapse whitespace
-    return re.sub(r"\s+", " ", text).strip()
-
-def _walk_parts_for_text(payload: dict) -> str:
-    if not payload:
-        return ""
-    # Prefer text/plain
-    if payload.get("mimeType") == "text/plain" and payload.get("body", {}).get("data"):
-        return _decode_base64_to_text(payload["body"]["data"]) or ""
-    # Fallback text/html
-    if payload.get("mimeType") == "text/html" and payload.get("body", {}).get("data"):
-        html = _decode_base64_to_text(payload["body"]["data"]) or ""
-        return _strip_html(html)
-    # Recurse into parts
-    for part in (payload.get("parts") or []):
-        text = _walk_parts_for_text(part)
-        if text:
-            return text
-    # Last resort: body at this level
-    if payload.get("body", {}).get("data"):
-        return _decode_base64_to_text(payload["body"]["data"]) or ""
-    return ""
-
-def _walk_parts_for_calendar(payload: dict) -> str:
-    """Return raw ICS text if a text/calendar part is found."""
-    if not payload:
-        return ""
-    if payload.get("mimeType") == "text/calendar" and payload.get("body", {}).get("data"):
-        return _decode_base64_to_text(payload["body"]["data"]) or ""
-    for part in (payload.get("parts") or []):
-        data = _walk_parts_for_calendar(part)
-        if data:
-            return data
-    if payload.get("body", {}).get("data") and payload.get("mimeType", "").endswith("calendar"):
-        return _decode_base64_to_text(payload["body"]["data"]) or ""
-    return ""
+# Extraction results keyed by (user, Gmail message id, extractor version); None marks non-event mail.
+# Set RESULT_CACHE_DB to a SQLite path to share entries across workers and restarts.
+PROCESSED_CACHE = cache_from_env("extraction", "RESULT_CACHE")
+# Fetch format=metadata first and skip the full download for mail with no date/event hints
+METADATA_PREFILTER = os.getenv("METADATA_PREFILTER", "true").lower() == "true"
+# Gmail address behind each access token, so /events does not call getProfile for every page
+TOKEN_USERS = cache_from_env("token_user", "TOKEN_USER_CACHE", ttl_seconds=300, negative_ttl_seconds=0)
+# Largest page /events returns
+EVENTS_PAGE_MAX = int(os.getenv("EVENTS_PAGE_MAX", "200"))
+# Background /process_emails?mode=async jobs (per process: poll the worker that accepted the job)
+JOBS = JobRegistry(
+    max_workers=int(os.getenv("JOB_WORKERS", "4")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", "3600")),
+)
+
+# Seconds between background runs of the expired-event cleanup (0 = only via /cleanup_reminders)
+CLEANUP_INTERVAL_SECONDS = float(os.getenv("CLEANUP_INTERVAL_SECONDS", "0"))
+
 
+def _cleanup_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            deleted = delete_expired_events()
+            if deleted:
+                print(f"🧹 Deleted {len(deleted)} expired events")
+        except Exception as e:
+            print(f"⚠️ Scheduled cleanup failed: {e}")
+
+
+def _start_server_process():
+    """One-time startup of the server process: schema migration, cleanup thread, local NER model.
+
+    Kept out of module import: with RULES_PROCESSES > 0 every spawned rules worker
+    re-imports this file as __mp_main__, and must not repeat any of it.
+    """
+    # Create or migrate the events schema once, before the first request
+    init_db()
+    if CLEANUP_INTERVAL_SECONDS > 0:
+        threading.Thread(target=_cleanup_loop, args=(CLEANUP_INTERVAL_SECONDS,), name="cleanup", daemon=True).start()
+    # Load the in-process NER model at startup rather than on the first email that needs it
+    if ner_local.NER_BACKEND == "local":
+        ner_local.load()
+
+# ---- Helpers to extract readable body text from Gmail payload ----
+@metrics.timed("ics_parse")
 def _extract_event_from_ics(ics_text: str) -> dict:
-    """Parse ICS and return event fields if possible."""
-    try:
-        cal = Calendar.from_ical(ics_text)
-    except Exception:
+    """Parse ICS and return event fields (date/time in UTC) if possible.
+
+    The fields are those of the next upcoming event or occurrence (else the first
+    one); when the attachment holds more than one, all of them are under "events".
+    """
+    events = extract_ics_events(ics_text)
+    if not events:
         return {}
-    summary = None
-    date_str = None
-    time_str = None
-    venue = None
-    for component in cal.walk():
-        if component.name == "VEVENT":
-            summary = str(component.get("summary")) if component.get("summary") else None
-            dtstart = component.get("dtstart")
-            location = component.get("location")
-            if dtstart:
-                try:
-                    val = dtstart.dt
-                    if isinstance(val, datetime):
-                        date_str = val.strftime("%Y-%m-%d")
-                        time_str = val.strftime("%H:%M")
-                    else:
-                        # date only
-                        date_str = val.strftime("%Y-%m-%d")
-                except Exception:
-                    pass
-            if location:
-                venue = str(location)
-            break
-    if any([summary, date_str, time_str, venue]):
-        return {
-            "event": summary,
-            "event_name": summary,
-            "date": date_str,
-            "time": time_str,
-            "venue": venue,
-            "source": "ics",
-            "confidence": 1.0 if date_str and (time_str or venue) else 0.9,
-        }
-    return {}
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+    upcoming = [e for e in events if e["date"] and f"{e['date']} {e['time'] or '23:59'}" >= now]
+    result = dict(min(upcoming, key=lambda e: (e["date"], e["time"] or "")) if upcoming else events[0])
+    if len(events) > 1:
+        result["events"] = events
+    return result
+
+def _header_value(headers: list, name: str, default: str = "") -> str:
+    return next((h["value"] for h in headers if h["name"].lower() == name.lower()), default)
+
+def _needs_full_fetch(meta: dict) -> bool:
+    """Decide from a format=metadata response whether the full body is worth downloading."""
+    headers = meta.get("payload", {}).get("headers", [])
+    content_type = _header_value(headers, "Content-Type").lower()
+    # Calendar invites usually arrive as multipart/mixed with a text/calendar part
+    if "calendar" in content_type or "multipart/mixed" in content_type:
+        return True
+    return looks_event_related(_header_value(headers, "Subject"), meta.get("snippet"))
+
+def _extract_from_payload(subject: str, payload: dict, deadline: Optional[Deadline] = None) -> Tuple[dict, Optional[dict]]:
+    """Return (result, pending fallback or None).
+
+    Batchable fallbacks (Gemini, NER) are left to the caller (see resolve_deferred)
+    whenever they would be the last steps anyway.
+    """
+    # Pipeline order: if LLM_FIRST=true, try text first then ICS; else ICS first
+    result = {}
+    # One walk finds the text and calendar parts; each is decoded only when it is used
+    with metrics.timed("mime_walk"):
+        parts = scan_payload(payload)
+    with metrics.timed("mime_decode"):
+        ics_data = parts.calendar()
+    if os.getenv("LLM_FIRST", "false").lower() == "true":
+        with metrics.timed("mime_decode"):
+            body_data = parts.text()
+        if ics_data:
+            # The ICS fallback depends on the complete text result, so NER cannot be deferred here
+            result = extract_event_details(subject, body_data, deadline=deadline)
+            if not result or count_event_fields(result) < 2:
+                result = _extract_event_from_ics(ics_data)
+            return result, None
+        return extract_event_details_deferred(subject, body_data, defer_llm=True, deadline=deadline)
+    if ics_data:
+        result = _extract_event_from_ics(ics_data)
+    if not result or count_event_fields(result) < 2:
+        with metrics.timed("mime_decode"):
+            body_data = parts.text()
+        return extract_event_details_deferred(subject, body_data, defer_llm=True, deadline=deadline)
+    return result, None
+
+def _extract_message(msg_detail: Optional[dict], deadline: Optional[Deadline] = None) -> Optional[Tuple[str, dict, Optional[dict]]]:
+    """Return (subject, extraction result, pending fallback) for a full message, or None if it failed."""
+    if msg_detail is None:
+        return None
+    try:
+        # ✅ Extract Subject
+        headers = msg_detail.get("payload", {}).get("headers", [])
+        subject = _header_value(headers, "Subject", "No Subject")
+        with metrics.timed("extract"):
+            return (subject, *_extract_from_payload(subject, msg_detail.get("payload", {}), deadline))
+    except Exception as e:
+        print(f"⚠️ Skipping email due to error: {e}")
+        return None
+
+def _settle(user: Optional[str], msg_id: str, subject: str, result: dict, to_save: list, failed: list) -> bool:
+    """Cache a finished extraction and queue events in `to_save`; True if it is an event to report.
+
+    A non-event whose fallbacks did not all answer is not cached but added to `failed`,
+    so a transient HF/Gemini failure or a spent LLM budget does not hide the email for good.
+    """
+    cache_key = (user, msg_id, EXTRACTOR_VERSION)
+    unanswered = result.pop("unanswered", None)
+    metrics.count_source(result.get("source"))
+    if is_event_like(result, minimum_required=2):
+        # If all three present, mark attendees = 1 (legacy behavior)
+        if count_event_fields(result) >= 3:
+            result["attendees"] = 1
+        PROCESSED_CACHE.set(cache_key, result)
+        to_save.append((result, user, msg_id))
+        return True
+    if unanswered:
+        failed.append(msg_id)
+        print(f"ℹ️ Not caching email with insufficient fields; no answer from {'+'.join(unanswered)}. Subject='{subject}'")
+        return False
+    PROCESSED_CACHE.set(cache_key, None)
+    print(f"ℹ️ Skipping email due to insufficient fields (need >=2). Subject='{subject}', details={result}")
+    return False
 
 # Optional logging configuration
 if os.getenv("DEBUG_NER", "0") not in (None, "", "0", "false", "False"):
@@ -142,11 +202,17 @@ if os.getenv("DEBUG_NER", "0") not in (None, "", "0", "false", "False"):
 @app.before_request
 def block_non_json_post():
     # Allow POSTs without JSON for token-in-header endpoints
-    exempt_endpoints = {"fetch_emails", "process_all_emails", "cleanup"}
+    exempt_endpoints = {"fetch_emails", "process_all_emails", "process_emails_stream", "cleanup"}
     if request.method == 'POST' and not request.is_json and (request.endpoint not in exempt_endpoints):
         return jsonify({"error": "Only JSON POST requests allowed"}), 415
 
 
+# The threaded dev server runs each request on a new thread, so its DB connection must not outlive the request
+@app.teardown_request
+def close_db_connection(exc):
+    close_connection()
+
+
 @app.route("/", methods=["GET"]) 
 def health_check():
     return jsonify({"status": "ok"}), 200
@@ -237,14 +303,19 @@ def fetch_emails():
 
     try:
         creds = Credentials(token=access_token)
-        service = build("gmail", "v1", credentials=creds)
+        service = build_gmail_service(creds)
 
         results = service.users().messages().list(userId="me", maxResults=10, q="is:unread").execute()
         messages = results.get("messages", [])
 
+        details = fetch_messages(
+            service, [m["id"] for m in messages], format='metadata', metadataHeaders=['Subject']
+        )
+
         email_list = []
-        for msg in messages:
-            msg_detail = service.users().messages().get(userId="me", id=msg['id'], format='metadata', metadataHeaders=['Subject']).execute()
+        for msg, msg_detail in zip(messages, details):
+            if msg_detail is None:
+                continue
             headers = msg_detail.get("payload", {}).get("headers", [])
             subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
             email_list.append({
@@ -260,6 +331,164 @@ def fetch_emails():
             "hint": "Ensure the provided token is a Gmail OAuth access token with gmail.readonly scope."
         }), 401
 
+def _iter_mailbox(access_token: str, sync_mode: str, llm_budget: bool = True) -> Iterator[dict]:
+    """Run extraction over the user's mailbox, yielding each event as soon as it is accepted.
+
+    Independent of the Flask request so it can also drive background jobs and
+    streaming responses. The generator's return value is a summary dict.
+    `llm_budget=False` lifts LLM_REQUEST_BUDGET_SECONDS (nobody is waiting on the response).
+    """
+    creds = Credentials(token=access_token)
+    service = build_gmail_service(creds)
+    backlog = False
+    with metrics.timed("gmail_list"):
+        profile = service.users().getProfile(userId="me").execute()
+        user = profile.get("emailAddress")
+        new_history_id = None
+        if sync_mode == "incremental":
+            message_ids, new_history_id, backlog = sync_message_ids(service, get_history_id(user), profile)
+            # Messages that failed during earlier syncs are not in the new history; pick them up again
+            message_ids = list(dict.fromkeys(message_ids + get_retry_message_ids(user)))
+        else:
+            results = service.users().messages().list(
+                userId="me", maxResults=20, q="is:unread"
+            ).execute()
+            message_ids = [m["id"] for m in results.get("messages", [])]
+    if sync_mode == "incremental":
+        print(f"📥 New messages since last sync: {len(message_ids)}" + (" (backlog)" if backlog else ""))
+    else:
+        print(f"📥 Fetched unread messages: {len(message_ids)}")
+    # Bounds the Gemini time this run can spend, from its first LLM call; emails reached after it skip the LLM.
+    # A backlog sync (first sync, expired historyId) is not bounded either: most of a backlog would skip the LLM.
+    deadline = Deadline(LLM_REQUEST_BUDGET_SECONDS if llm_budget and not backlog else None)
+    extracted = 0
+    full_fetches_avoided = 0
+    # Ids whose fetch or extraction failed; kept for the next incremental sync instead of being skipped for good
+    failed = []
+
+    # 1) Resolve known messages from the result cache, then from saved events, before any Gmail call
+    pending = []
+    for msg_id in message_ids:
+        hit, cached = PROCESSED_CACHE.lookup((user, msg_id, EXTRACTOR_VERSION))
+        if hit:
+            metrics.SHORTCUT_TOTAL.inc(via="cache")
+            if cached:
+                extracted += 1
+                yield cached
+            full_fetches_avoided += 1
+        else:
+            pending.append(msg_id)
+    with metrics.timed("db_lookup"):
+        saved = get_events_by_message_ids(user, pending)
+    for msg_id in pending:
+        if msg_id in saved:
+            metrics.SHORTCUT_TOTAL.inc(via="db")
+            extracted += 1
+            yield saved[msg_id]
+            PROCESSED_CACHE.set((user, msg_id, EXTRACTOR_VERSION), saved[msg_id])
+            full_fetches_avoided += 1
+    pending = [msg_id for msg_id in pending if msg_id not in saved]
+
+    # 2) Look at headers + snippet first; only download full bodies that extraction will use
+    if METADATA_PREFILTER and pending:
+        with metrics.timed("gmail_fetch_metadata"):
+            metas = fetch_messages(
+                service, pending, format="metadata", metadataHeaders=["Subject", "Content-Type"]
+            )
+        to_fetch = []
+        for msg_id, meta in zip(pending, metas):
+            if meta is None:
+                failed.append(msg_id)
+                continue
+            if _needs_full_fetch(meta):
+                to_fetch.append(msg_id)
+            else:
+                metrics.SHORTCUT_TOTAL.inc(via="prefilter")
+                PROCESSED_CACHE.set((user, msg_id, EXTRACTOR_VERSION), None)
+                full_fetches_avoided += 1
+        pending = to_fetch
+
+    # 3) Download full bodies one batch at a time and extract each batch across the worker pool.
+    #    Results come back in the original message order; only one batch of payloads is held at once.
+    #    Emails that still need the Gemini/NER fallbacks are collected across batches and resolved together.
+    deferred = []
+
+    def _flush_deferred(count: int):
+        batch = deferred[:count]
+        del deferred[:count]
+        resolve_deferred([(msg_id, result, fallback) for msg_id, _, result, fallback in batch], deadline=deadline)
+        return [(msg_id, subject, result) for msg_id, subject, result, _ in batch]
+
+    # Accepted events are written once per batch, in one transaction
+    to_save = []
+    saved = {"inserted": 0, "deduplicated": 0}
+
+    def _save_events():
+        if to_save:
+            with metrics.timed("db_write"):
+                counts = save_events(to_save)
+            del to_save[:]
+            for key in saved:
+                saved[key] += counts[key]
+
+    try:
+        for start in range(0, len(pending), GMAIL_BATCH_SIZE):
+            chunk = pending[start:start + GMAIL_BATCH_SIZE]
+            with metrics.timed("gmail_fetch_full"):
+                details = fetch_messages(service, chunk, format="full")
+            for msg_id, extraction in zip(chunk, map_ordered(partial(_extract_message, deadline=deadline), details)):
+                if extraction is None:
+                    failed.append(msg_id)
+                    continue
+                subject, result, fallback = extraction
+                if fallback is not None:
+                    deferred.append((msg_id, subject, result, fallback))
+                elif _settle(user, msg_id, subject, result, to_save, failed):
+                    extracted += 1
+                    yield result
+            # Only full batches go out mid-run; the remainder waits for the next chunk
+            flush = len(deferred) if start + GMAIL_BATCH_SIZE >= len(pending) else len(deferred) - len(deferred) % HF_NER_BATCH_SIZE
+            for msg_id, subject, result in _flush_deferred(flush):
+                if _settle(user, msg_id, subject, result, to_save, failed):
+                    extracted += 1
+                    yield result
+            _save_events()
+    finally:
+        # Also when a streaming client disconnects mid-run: events already sent are still stored
+        _save_events()
+
+    if user and new_history_id:
+        set_history_id(user, new_history_id, failed_ids=failed)
+    print(f"✅ Extracted events: {extracted}")
+    if failed:
+        print(f"⚠️ Failed messages: {len(failed)}")
+    print(f"💾 Saved events: {saved['inserted']} new, {saved['deduplicated']} already stored")
+    print(f"🗃️ Result cache: {PROCESSED_CACHE.stats()}, full fetches avoided: {full_fetches_avoided}")
+    print(f"🧠 HF NER: {hf_client.stats()}")
+    if os.getenv("LLM_FALLBACK_ENABLED", "false").lower() == "true":
+        from llm_fallback import cache_stats, call_stats
+        print(f"🤖 Gemini cache: {cache_stats()}, calls: {call_stats()}")
+    return {
+        "user": user,
+        "listed": len(message_ids),
+        "extracted": extracted,
+        "full_fetches_avoided": full_fetches_avoided,
+        "saved": saved["inserted"],
+        "duplicates_skipped": saved["deduplicated"],
+        "failed": len(failed),
+    }
+
+
+def _process_mailbox(access_token: str, sync_mode: str, emit: Callable[[dict], None], llm_budget: bool = True) -> dict:
+    """Drive _iter_mailbox, passing each event to `emit`; returns the summary."""
+    events = _iter_mailbox(access_token, sync_mode, llm_budget)
+    while True:
+        try:
+            emit(next(events))
+        except StopIteration as stop:
+            return stop.value
+
+
 @app.route("/process_emails", methods=["GET", "POST", "OPTIONS"])
 def process_all_emails():
     if request.method == 'OPTIONS':
@@ -271,84 +500,219 @@ def process_all_emails():
             "hint": "Send a Gmail OAuth access token via Authorization: Bearer <token> or JSON {accessToken}. An ID token will not work for Gmail API."
         }), 401
 
+    # ?sync=incremental (or GMAIL_SYNC_MODE) only processes mail added since the last poll
+    sync_mode = (request.args.get("sync") or GMAIL_SYNC_MODE).lower()
+
+    # ?mode=async queues the work and returns a job id to poll or stream from /jobs/<id>
+    if (request.args.get("mode") or "").lower() == "async":
+        # No one waits on a background job, so it is not held to the interactive LLM budget
+        job = JOBS.submit(partial(_process_mailbox, llm_budget=False), access_token, sync_mode)
+        return jsonify({"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}), 202
+
     try:
-        creds = Credentials(token=access_token)
-        service = build("gmail", "v1", credentials=creds)
-        results = service.users().messages().list(
-            userId="me", maxResults=20, q="is:unread"
-        ).execute()
-        messages = results.get("messages", [])
-        print(f"📥 Fetched unread messages: {len(messages)}")
         extracted = []
+        with metrics.profile_request(_wants_profile()) as profile:
+            summary = _process_mailbox(access_token, sync_mode, extracted.append)
+        response = jsonify(extracted)
+        response.headers["X-Full-Fetches-Avoided"] = str(summary["full_fetches_avoided"])
+        if profile is not None:
+            response.headers["Server-Timing"] = profile.server_timing()
+        return response
 
-        for msg in messages:
-            try:
-                msg_detail = service.users().messages().get(
-                    userId="me", id=msg["id"], format="full"
-                ).execute()
-
-                # ✅ Extract Subject
-                headers = msg_detail.get("payload", {}).get("headers", [])
-                subject = next(
-                    (h["value"] for h in headers if h["name"] == "Subject"),
-                    "No Subject"
-                )
-
-                # Caching by Gmail message id
-                cache_key = msg["id"]
-                if cache_key in PROCESSED_CACHE:
-                    extracted.append(PROCESSED_CACHE[cache_key])
-                    continue
+    except Exception as e:
+        print("📡 Gmail API error:", str(e))
+        return jsonify({
+            "error": "Failed to process emails",
+            "hint": "Ensure the provided token is a Gmail OAuth access token with gmail.readonly scope."
+        }), 401
 
-                # Pipeline order: if LLM_FIRST=true, try text first then ICS; else ICS first
-                result = {}
-                if os.getenv("LLM_FIRST", "false").lower() == "true":
-                    body_data = _walk_parts_for_text(msg_detail.get("payload", {}))
-                    result = extract_event_details(subject, body_data)
-                    if not result or count_event_fields(result) < 2:
-                        ics_data = _walk_parts_for_calendar(msg_detail.get("payload", {}))
-                        if ics_data:
-                            result = _extract_event_from_ics(ics_data)
-                else:
-                    ics_data = _walk_parts_for_calendar(msg_detail.get("payload", {}))
-                    if ics_data:
-                        result = _extract_event_from_ics(ics_data)
-                    if not result or count_event_fields(result) < 2:
-                        body_data = _walk_parts_for_text(msg_detail.get("payload", {}))
-                        result = extract_event_details(subject, body_data)
-
-                if is_event_like(result, minimum_required=2):
-                    # If all three present, mark attendees = 1 (legacy behavior)
-                    if count_event_fields(result) >= 3:
-                        result["attendees"] = 1
-                    extracted.append(result)
-                    PROCESSED_CACHE[cache_key] = result
-                    save_to_db(result)
-                else:
-                    print(f"ℹ️ Skipping email due to insufficient fields (need >=2). Subject='{subject}', details={result}")
-
-            except Exception as e:
-                print(f"⚠️ Skipping email due to error: {e}")
-                continue
 
-        print(f"✅ Extracted events: {len(extracted)}")
-        return jsonify(extracted)
+@app.route("/process_emails/stream", methods=["GET", "POST", "OPTIONS"])
+def process_emails_stream():
+    """Like /process_emails, but streams each event as soon as it is extracted.
+
+    ?format=ndjson (default) emits one JSON record per line; ?format=sse emits
+    Server-Sent Events. Either way the last record is the run summary, or an
+    error record if Gmail rejected the request mid-stream.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({"ok": True}), 200
+    access_token = _extract_bearer_or_body_token()
+    if not access_token:
+        return jsonify({
+            "error": "Missing access token",
+            "hint": "Send a Gmail OAuth access token via Authorization: Bearer <token> or JSON {accessToken}. An ID token will not work for Gmail API."
+        }), 401
+
+    sync_mode = (request.args.get("sync") or GMAIL_SYNC_MODE).lower()
+    use_sse = (request.args.get("format") or "ndjson").lower() == "sse"
+
+    def _record(kind: str, payload: dict) -> str:
+        if use_sse:
+            return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"type": kind, **payload}) + "\n"
+
+    profiling = _wants_profile()
+
+    def generate():
+        events = _iter_mailbox(access_token, sync_mode)
+        profile = metrics.Profile() if profiling else None
+        try:
+            while True:
+                try:
+                    # The response iterator resumes this generator step by step; install the profile around each step
+                    with metrics.use_profile(profile):
+                        event = next(events)
+                except StopIteration as stop:
+                    summary = dict(stop.value or {})
+                    if profile is not None:
+                        summary["stages"] = profile.breakdown()
+                    yield _record("summary", summary)
+                    return
+                yield _record("event", {"event": event})
+        except Exception as e:
+            print("📡 Gmail API error:", str(e))
+            yield _record("error", {
+                "error": "Failed to process emails",
+                "hint": "Ensure the provided token is a Gmail OAuth access token with gmail.readonly scope."
+            })
+
+    mimetype = "text/event-stream" if use_sse else "application/x-ndjson"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    # Stop reverse proxies from buffering the stream
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _wants_profile() -> bool:
+    """Per-request stage breakdown, asked for with `X-Profile: 1` or ?profile=1."""
+    return request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1"
+
 
+def _user_for_token(access_token: str) -> Optional[str]:
+    key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+    hit, user = TOKEN_USERS.lookup(key)
+    if not hit:
+        service = build_gmail_service(Credentials(token=access_token))
+        user = service.users().getProfile(userId="me").execute().get("emailAddress")
+        TOKEN_USERS.set(key, user)
+    return user
+
+
+def _day_start(value: str) -> int:
+    return calendar.timegm(datetime.strptime(value, "%Y-%m-%d").timetuple())
+
+
+def _encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(f"{row['start_ts']}:{row['id']}".encode("ascii")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, int]:
+    start_ts, event_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split(":")
+    return int(start_ts), int(event_id)
+
+
+@app.route("/events", methods=["GET", "OPTIONS"])
+def list_events():
+    """Saved events of the token's user in start order, one page at a time, without re-running extraction.
+
+    ?from=YYYY-MM-DD (default today, UTC) and ?to=YYYY-MM-DD (exclusive) bound the start,
+    ?source=ics|rules|gemini|ner keeps events whose extraction path used that step,
+    ?limit=N (max EVENTS_PAGE_MAX). Pass the returned next_cursor as ?cursor= for the next page.
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({"ok": True}), 200
+    access_token = _extract_bearer_or_body_token()
+    if not access_token:
+        return jsonify({
+            "error": "Missing access token",
+            "hint": "Send a Gmail OAuth access token via Authorization: Bearer <token>."
+        }), 401
+    try:
+        user = _user_for_token(access_token)
     except Exception as e:
         print("📡 Gmail API error:", str(e))
         return jsonify({
-            "error": "Failed to process emails",
+            "error": "Failed to identify the user",
             "hint": "Ensure the provided token is a Gmail OAuth access token with gmail.readonly scope."
         }), 401
 
+    source = (request.args.get("source") or "").lower() or None
+    try:
+        start_from = _day_start(request.args.get("from") or datetime.utcnow().strftime("%Y-%m-%d"))
+        start_to = _day_start(request.args["to"]) if request.args.get("to") else None
+        after = _decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = min(max(1, int(request.args.get("limit", 50))), EVENTS_PAGE_MAX)
+        if source is not None and not source.isalpha():
+            raise ValueError(source)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid query", "hint": "from/to: YYYY-MM-DD, limit: integer, source: ics|rules|gemini|ner, cursor: next_cursor of a previous page"}), 400
+
+    # One row past the page says whether another page exists
+    events = list(iter_events(user, start_from=start_from, start_to=start_to, source=source, after=after, limit=limit + 1))
+    next_cursor = _encode_cursor(events[limit - 1]) if len(events) > limit else None
+    return jsonify({"events": events[:limit], "next_cursor": next_cursor}), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus text format: stage histograms, source counts, cache and fallback client stats."""
+    caches = [({"cache": "extraction"}, PROCESSED_CACHE.stats())]
+    clients = [({"client": "hf_ner"}, hf_client.stats())]
+    if os.getenv("LLM_FALLBACK_ENABLED", "false").lower() == "true":
+        from llm_fallback import cache_stats, call_stats
+        caches.append(({"cache": "gemini"}, cache_stats()))
+        clients.append(({"client": "gemini"}, call_stats()))
+    body = metrics.render(
+        metrics.render_stats("cache", "Extraction result and Gemini response cache counters.", caches),
+        metrics.render_stats("fallback_client", "HF NER and Gemini call outcomes and latency (ms).", clients),
+    )
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Job status plus events found so far; pass ?since=N to get only events after the first N."""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    since = request.args.get("since", default=0, type=int)
+    return jsonify(job.snapshot(since=since)), 200
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Stream a job's events as NDJSON while it runs, ending with a status record."""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+
+    def generate():
+        for event in job.iter_events():
+            yield json.dumps({"type": "event", "event": event}) + "\n"
+        final = job.snapshot(since=len(job.events))
+        final.pop("events", None)
+        yield json.dumps({"type": "status", **final}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _cleanup_job(emit: Callable[[dict], None]) -> dict:
+    return {"deleted": len(delete_expired_events())}
+
 
 @app.route("/cleanup_reminders", methods=["POST"])
 def cleanup():
-    from db_utils import delete_expired_events
+    # ?mode=async returns at once; the deleted count lands in the job summary at /jobs/<id>
+    if (request.args.get("mode") or "").lower() == "async":
+        job = JOBS.submit(_cleanup_job)
+        return jsonify({"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}), 202
     deleted = delete_expired_events()
     return jsonify({"deleted": deleted})
 
 
 # ✅ Main runner
 if __name__ == '__main__':
+    _start_server_process()
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,38 @@
+"""Accuracy and throughput of the fast date engine vs full dateparser.search_dates.
+
+Usage: python -m benchmarks.bench_dates [--repeat 3]
+"""
+import argparse
+
+import date_extract
+from benchmarks.common import load_corpus, time_per_item
+from extractor import _clean_text, _extract_date_and_time
+
+
+def _accuracy(corpus, key_index: int, key: str) -> float:
+    hits = 0
+    for email in corpus:
+        got = _extract_date_and_time(_clean_text(email["body"]))[key_index]
+        hits += got == email["expected"][key]
+    return hits / len(corpus)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    texts = [_clean_text(e["body"]) for e in corpus]
+    print(f"{len(corpus)} emails, languages={date_extract.DATE_LANGUAGES}")
+    for engine in ("dateparser", "fast"):
+        date_extract.DATE_ENGINE = engine
+        per_email = time_per_item(_extract_date_and_time, texts, repeat=args.repeat)
+        print(
+            f"{engine:>10}: {per_email * 1000:7.2f} ms/email  {1 / per_email:8.1f} emails/s  "
+            f"date_acc={_accuracy(corpus, 0, 'date'):.2f}  time_acc={_accuracy(corpus, 1, 'time'):.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare sequential vs batched Gmail message fetching against the offline stub.
+
+Usage: python -m benchmarks.bench_gmail_fetch [--messages 20] [--latency 0.05] [--batch-size 50]
+"""
+import argparse
+import time
+
+import gmail_utils
+from benchmarks.gmail_stub import build_stub_service, make_mailbox
+
+
+def _run(mode: str, mailbox, latency: float, batch_size: int):
+    gmail_utils.GMAIL_FETCH_MODE = mode
+    service, http = build_stub_service(mailbox, latency=latency)
+    start = time.perf_counter()
+    listed = service.users().messages().list(userId="me", maxResults=len(mailbox), q="is:unread").execute()
+    ids = [m["id"] for m in listed.get("messages", [])] + ["missing-id"]
+    details = gmail_utils.fetch_messages(service, ids, batch_size=batch_size, format="full")
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for d in details if d is not None)
+    return elapsed, http.round_trips, ok, len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per HTTP round trip")
+    parser.add_argument("--batch-size", type=int, default=gmail_utils.GMAIL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    mailbox = make_mailbox(args.messages)
+    for mode in ("sequential", "batch"):
+        elapsed, trips, ok, total = _run(mode, mailbox, args.latency, args.batch_size)
+        print(f"{mode:>10}: {elapsed * 1000:8.1f} ms  round_trips={trips:3d}  fetched={ok}/{total}")
+
+
+if __name__ == "__main__":
+    main()
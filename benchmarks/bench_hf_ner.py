@@ -0,0 +1,80 @@
+"""NER call overhead and failure behaviour against the local HF stub.
+
+Compares one bare requests.post per email (the old path) with the pooled
+hf_client session and with batched requests (apply_ner_batch), then points
+the client at a hung endpoint to show how many emails pay the full timeout
+before the circuit breaker opens.
+
+Usage: python -m benchmarks.bench_hf_ner [--calls 200] [--latency 0.0] [--batch-size 16] [--timeout 0.5]
+"""
+import argparse
+import time
+
+import requests
+
+import extractor
+import hf_client
+from benchmarks.common import load_corpus
+from benchmarks.hf_stub import StubConfig, start_stub_server
+
+
+def _bare_post(url: str, text: str):
+    return requests.post(url, headers={"Accept": "application/json"}, json={"inputs": text}, timeout=8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated model latency per request")
+    parser.add_argument("--batch-size", type=int, default=hf_client.HF_NER_BATCH_SIZE)
+    parser.add_argument("--timeout", type=float, default=0.5, help="client timeout used against the hung endpoint")
+    args = parser.parse_args()
+
+    texts = [e["body"] for e in load_corpus()]
+    texts = (texts * (args.calls // len(texts) + 1))[:args.calls]
+
+    config = StubConfig("ok", latency=args.latency)
+    server, url = start_stub_server(config)
+    hf_client.HF_API_URL = url
+
+    start = time.perf_counter()
+    for text in texts:
+        _bare_post(url, text)
+    bare = time.perf_counter() - start
+    bare_conns, config.connections = config.connections, 0
+
+    start = time.perf_counter()
+    for text in texts:
+        hf_client.post_inference(text)
+    pooled = time.perf_counter() - start
+    pooled_conns, config.connections = config.connections, 0
+
+    requests_before = config.requests
+    start = time.perf_counter()
+    extractor.apply_ner_batch([({}, text) for text in texts], batch_size=args.batch_size)
+    batched = time.perf_counter() - start
+    print(f"{'bare post':>12}: {bare / len(texts) * 1000:6.2f} ms/email  requests={len(texts)}  connections={bare_conns}")
+    print(f"{'session':>12}: {pooled / len(texts) * 1000:6.2f} ms/email  requests={len(texts)}  connections={pooled_conns}")
+    print(f"{'batched':>12}: {batched / len(texts) * 1000:6.2f} ms/email  requests={config.requests - requests_before}  connections={config.connections}")
+    print(f"{'':>12}  {hf_client.stats()}")
+    server.shutdown()
+
+    # Endpoint that accepts connections but never answers in time
+    down = StubConfig("down", hang=args.timeout * 4)
+    server, url = start_stub_server(down)
+    hf_client.HF_API_URL = url
+    hf_client.BREAKER = hf_client.CircuitBreaker(hf_client.HF_BREAKER_FAILURES, 60)
+    hf_client.METRICS = hf_client.CallMetrics()
+    emails = 50
+    start = time.perf_counter()
+    for text in texts[:emails]:
+        hf_client.post_inference(text, timeout_seconds=args.timeout)
+    elapsed = time.perf_counter() - start
+    without = emails * args.timeout
+    print(f"{'hung model':>12}: {emails} emails in {elapsed:5.2f} s (>= {without:.1f} s without the breaker)")
+    print(f"{'':>12}  {hf_client.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
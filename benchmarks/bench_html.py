@@ -0,0 +1,82 @@
+"""Single-pass html_to_text vs the old regex strip + BeautifulSoup re-parse.
+
+Usage: python -m benchmarks.bench_html [--rows 400] [--repeat 5]
+"""
+import argparse
+import re
+
+from benchmarks.common import time_per_item
+from extractor import _clean_text
+from html_text import html_to_text
+
+
+def marketing_email(rows: int) -> str:
+    style = "<style>" + "".join(f".c{i}{{color:#{i:06x};padding:{i % 9}px}}" for i in range(300)) + "</style>"
+    script = "<script>" + "var t=[" + ",".join(str(i) for i in range(2000)) + "];</script>"
+    cells = "".join(
+        f"<tr><td class='c{i % 300}'><a href='https://example.com/p/{i}'><img src='https://cdn.example.com/{i}.png' "
+        f"alt='Product {i}'></a></td><td><p>Deal {i}: save {i % 70}% &amp; free shipping&nbsp;today</p>"
+        f"<div>Offer ends 30 Nov 2026 at 11:59 PM</div></td></tr>"
+        for i in range(rows)
+    )
+    body = (
+        "<html><head><meta charset='utf-8'>" + style + script + "</head><body>"
+        "<div>Join our Holiday Launch Event on 5 December 2026 at 6:30 PM</div>"
+        "<p>Venue: Grand Ballroom, Harbour Convention Center</p>"
+        "<table>" + cells + "</table></body></html>"
+    )
+    return body
+
+
+def legacy_strip_html(html: str) -> str:
+    html = re.sub(r"<script[\s\S]*?</script>", " ", html, flags=re.IGNORECASE)
+    html = re.sub(r"<style[\s\S]*?</style>", " ", html, flags=re.IGNORECASE)
+    html = re.sub(r"<(br|/p|/div)>", "\n", html, flags=re.IGNORECASE)
+    text = re.sub(r"<[^>]+>", " ", html)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def legacy_clean_text(txt: str) -> str:
+    from bs4 import BeautifulSoup
+
+    if "<" in txt and ">" in txt:
+        txt = BeautifulSoup(txt, "html.parser").get_text(" ")
+    return re.sub(r"\s+", " ", txt).strip()
+
+
+def plain_text_email(rows: int) -> str:
+    """text/plain alternative of the same mail; "<url>" links made the old path run BeautifulSoup."""
+    lines = [f"Deal {i}: save {i % 70}% <https://example.com/p/{i}>" for i in range(rows)]
+    return "Join our Holiday Launch Event on 5 December 2026 at 6:30 PM\n" + "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+    except ImportError:
+        print("legacy path needs beautifulsoup4 installed; nothing to compare against")
+        return
+
+    cases = [
+        ("html part", marketing_email(args.rows), lambda h: _clean_text(html_to_text(h)),
+         lambda h: legacy_clean_text(legacy_strip_html(h))),
+        ("html part, 8x size", marketing_email(args.rows * 8), lambda h: _clean_text(html_to_text(h)),
+         lambda h: legacy_clean_text(legacy_strip_html(h))),
+        # Same body without the HTML_TEXT_MAX_CHARS cap: the per-KiB cost, not the truncation
+        ("html part, 8x, uncapped", marketing_email(args.rows * 8), lambda h: _clean_text(html_to_text(h, 0)),
+         lambda h: legacy_clean_text(legacy_strip_html(h))),
+        ("plain part with <links>", plain_text_email(args.rows), _clean_text, legacy_clean_text),
+    ]
+    for name, body, new_fn, old_fn in cases:
+        new = time_per_item(new_fn, [body], repeat=args.repeat)
+        old = time_per_item(old_fn, [body], repeat=args.repeat)
+        print(f"{name:>24} ({len(body) / 1024:5.0f} KiB): new {new * 1000:7.2f} ms  legacy {old * 1000:7.2f} ms  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
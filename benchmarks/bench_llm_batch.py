@@ -0,0 +1,82 @@
+"""One Gemini call per email vs batched and concurrent batched calls, against the offline Gemini stub.
+
+Runs the concurrent path twice against the same loop-bound client, then once more under
+a request budget shorter than the work (by default half the measured concurrent time),
+to show how many emails skip the LLM once it is spent. With LLM_CONCURRENCY=2,
+--batch-size 4 and --budget 1.5 the calls run in waves and the budget cuts the run
+partway (16 of 32 answered).
+
+Usage: python -m benchmarks.bench_llm_batch [--emails 32] [--batch-size 8] [--base-latency 0.4]
+                                            [--per-email-latency 0.05] [--budget SECONDS]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("LLM_CACHE_DB", "")  # measure the calls, not the shared cache
+
+import llm_fallback
+from extraction_pool import Deadline
+from benchmarks.common import load_corpus
+from benchmarks.gemini_stub import StubGeminiModel, install
+from extractor import _clean_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--base-latency", type=float, default=0.4)
+    parser.add_argument("--per-email-latency", type=float, default=0.05)
+    parser.add_argument("--budget", type=float, help="request LLM budget for the last run, seconds "
+                        "(default: half the concurrent run's time)")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    items = [(f"m{i}", e["subject"], _clean_text(e["body"])) for i, e in enumerate((corpus * 10)[:args.emails])]
+    # Distinct bodies so the response cache does not answer repeats
+    items = [(item_id, subject, f"{text}\nref {item_id}") for item_id, subject, text in items]
+
+    stub = install(llm_fallback, StubGeminiModel(args.base_latency, args.per_email_latency))
+    start = time.perf_counter()
+    single = {item_id: llm_fallback.extract_with_gemini(subject, text) for item_id, subject, text in items}
+    single_time, single_calls = time.perf_counter() - start, stub.calls
+
+    llm_fallback.LLM_CACHE = llm_fallback.cache_from_env("gemini", "LLM_CACHE")
+    stub = install(llm_fallback, StubGeminiModel(args.base_latency, args.per_email_latency, fail_ids={"m1"}))
+    start = time.perf_counter()
+    batched = {}
+    for i in range(0, len(items), args.batch_size):
+        batched.update(llm_fallback.extract_with_gemini_batch(items[i:i + args.batch_size]))
+    batched_time, batched_calls = time.perf_counter() - start, stub.calls
+
+    chunks = [items[i:i + args.batch_size] for i in range(0, len(items), args.batch_size)]
+    llm_fallback.LLM_CACHE = llm_fallback.cache_from_env("gemini", "LLM_CACHE")
+    stub = install(llm_fallback, StubGeminiModel(args.base_latency, args.per_email_latency))
+    start = time.perf_counter()
+    concurrent = llm_fallback.run_gemini_batches(chunks)
+    concurrent_time, concurrent_calls = time.perf_counter() - start, stub.calls
+    # Second run on the same loop-bound stub: fails if each run got its own event loop
+    llm_fallback.LLM_CACHE = llm_fallback.cache_from_env("gemini", "LLM_CACHE")
+    again = llm_fallback.run_gemini_batches(chunks)
+    if any(again.get(k) != concurrent[k] for k in concurrent):
+        raise SystemExit("second run_gemini_batches on the same client lost answers: event loop not reused")
+
+    llm_fallback.LLM_CACHE = llm_fallback.cache_from_env("gemini", "LLM_CACHE")
+    stub = install(llm_fallback, StubGeminiModel(args.base_latency, args.per_email_latency))
+    start = time.perf_counter()
+    budget = args.budget or concurrent_time / 2
+    budgeted = llm_fallback.run_gemini_batches(chunks, deadline=Deadline(budget))
+    budget_time = time.perf_counter() - start
+
+    same = sum(1 for k in single if (single[k] or {}) == (batched.get(k) or {}) == (concurrent.get(k) or {}))
+    print(f"{'per email':>10}: {single_time:6.2f} s  calls={single_calls}")
+    print(f"{'batched':>10}: {batched_time:6.2f} s  calls={batched_calls} (m1 answered malformed, retried alone)")
+    print(f"{'concurrent':>10}: {concurrent_time:6.2f} s  calls={concurrent_calls}")
+    print(f"{'':>10}  identical results: {same}/{len(items)}")
+    print(f"{'budget':>10}: {budget_time:6.2f} s  budget={budget:.2f} s  answered={sum(1 for v in budgeted.values() if v)}/{len(items)}")
+    print(f"{'':>10}  {llm_fallback.call_stats()}")
+
+
+if __name__ == "__main__":
+    main()
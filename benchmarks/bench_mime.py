@@ -0,0 +1,117 @@
+"""Single-pass MIME walk (mime_parts.scan_payload) vs the previous two recursive walks.
+
+Runs both over the stored message corpus, checking they pick the same text and
+calendar, then over two attachment-heavy messages (inline base64 attachments, an
+oversized HTML part) and reports time and tracemalloc peak per message.
+
+Usage: python -m benchmarks.bench_mime [--repeat 5] [--attachment-mb 20]
+"""
+import argparse
+import base64
+import time
+import tracemalloc
+
+from benchmarks.common import load_corpus, time_per_item
+from html_text import html_to_text
+from mime_parts import scan_payload
+
+
+def _legacy_decode(data: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore")
+    except Exception:
+        return ""
+
+
+def legacy_walk_text(payload: dict) -> str:
+    if not payload:
+        return ""
+    if payload.get("mimeType") == "text/plain" and payload.get("body", {}).get("data"):
+        return _legacy_decode(payload["body"]["data"]) or ""
+    if payload.get("mimeType") == "text/html" and payload.get("body", {}).get("data"):
+        return html_to_text(_legacy_decode(payload["body"]["data"]) or "")
+    for part in (payload.get("parts") or []):
+        text = legacy_walk_text(part)
+        if text:
+            return text
+    if payload.get("body", {}).get("data"):
+        return _legacy_decode(payload["body"]["data"]) or ""
+    return ""
+
+
+def legacy_walk_calendar(payload: dict) -> str:
+    if not payload:
+        return ""
+    if payload.get("mimeType") == "text/calendar" and payload.get("body", {}).get("data"):
+        return _legacy_decode(payload["body"]["data"]) or ""
+    for part in (payload.get("parts") or []):
+        data = legacy_walk_calendar(part)
+        if data:
+            return data
+    if payload.get("body", {}).get("data") and payload.get("mimeType", "").endswith("calendar"):
+        return _legacy_decode(payload["body"]["data"]) or ""
+    return ""
+
+
+def legacy(payload: dict):
+    return legacy_walk_calendar(payload), legacy_walk_text(payload)
+
+
+def single_pass(payload: dict):
+    parts = scan_payload(payload)
+    return parts.calendar(), parts.text()
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def heavy_messages(attachment_mb: int):
+    """Attachment-heavy shapes: a huge HTML-only newsletter, and an invite with no text part."""
+    html = "<html><body>" + "<p>Big sale on garden furniture, this week only!</p>" * (attachment_mb * 20000 // 4) + "</body></html>"
+    attachment = {"mimeType": "application/octet-stream", "filename": "scan.bin",
+                  "body": {"data": _b64(bytes(range(256)) * (attachment_mb * 1024 * 1024 // 256 // 4))}}
+    ics = b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nSUMMARY:Review\r\nDTSTART:20261204T190000Z\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+    newsletter = {"mimeType": "multipart/mixed", "parts": [
+        {"mimeType": "multipart/alternative", "parts": [{"mimeType": "text/html", "body": {"data": _b64(html.encode())}}]},
+        *([attachment] * 4),
+    ]}
+    invite = {"mimeType": "multipart/mixed", "parts": [
+        *([attachment] * 4),
+        {"mimeType": "text/calendar", "filename": "invite.ics", "body": {"data": _b64(ics)}},
+    ]}
+    return [("html newsletter", newsletter), ("invite, no text", invite)]
+
+
+def _peak(fn, payload) -> float:
+    tracemalloc.start()
+    fn(payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--attachment-mb", type=int, default=20, help="total size of the inline attachments")
+    args = parser.parse_args()
+
+    payloads = [record["message"]["payload"] for record in load_corpus("messages.jsonl")]
+    same = sum(legacy(p) == single_pass(p) for p in payloads)
+    old = time_per_item(legacy, payloads, repeat=args.repeat)
+    new = time_per_item(single_pass, payloads, repeat=args.repeat)
+    print(f"{len(payloads)} corpus messages, identical results: {same}/{len(payloads)}")
+    print(f"  legacy: {old * 1e6:8.1f} us/message")
+    print(f"  single: {new * 1e6:8.1f} us/message  ({old / new:.1f}x)")
+
+    for label, heavy in heavy_messages(args.attachment_mb):
+        for name, fn in (("legacy", legacy), ("single", single_pass)):
+            start = time.perf_counter()
+            calendar, text = fn(heavy)
+            elapsed = time.perf_counter() - start
+            print(f"  {label} ({args.attachment_mb} MB), {name}: {elapsed * 1000:7.1f} ms  "
+                  f"peak {_peak(fn, heavy):6.1f} MiB  text={len(text)} chars  ics={len(calendar)} chars")
+
+if __name__ == "__main__":
+    main()
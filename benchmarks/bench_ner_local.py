@@ -0,0 +1,51 @@
+"""Per-email latency of the in-process NER backend (NER_BACKEND=local).
+
+Needs transformers + torch (or optimum[onnxruntime] with NER_LOCAL_ONNX=true)
+and the model in the local cache or NER_LOCAL_MODEL_PATH; the first run
+downloads it.
+
+Usage: python -m benchmarks.bench_ner_local [--batch-sizes 1,8,16] [--repeat 3]
+"""
+import argparse
+import time
+
+import ner_local
+from benchmarks.common import load_corpus
+from extractor import _aggregate_entities, _clean_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-sizes", default="1,8,16")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if not ner_local.load():
+        print("local NER backend unavailable; install transformers + torch to run this benchmark")
+        return
+    print(f"model load: {time.perf_counter() - start:.1f} s")
+
+    corpus = load_corpus()
+    texts = [_clean_text(e["body"]) for e in corpus]
+    ner_local.predict(texts[:2])  # warm-up
+    for size in (int(s) for s in args.batch_sizes.split(",")):
+        ner_local.NER_LOCAL_BATCH_SIZE = size
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for i in range(0, len(texts), size):
+                ner_local.predict(texts[i:i + size])
+            best = min(best, time.perf_counter() - start)
+        print(f"batch={size:3d}: {best / len(texts) * 1000:7.2f} ms/email")
+
+    hits = {"date": 0, "time": 0, "venue": 0}
+    for e, entities in zip(corpus, ner_local.predict(texts)):
+        fields = _aggregate_entities(entities or [])
+        for key in hits:
+            hits[key] += bool(fields.get(key)) and bool(e["expected"].get(key))
+    print(f"emails with a field found where one is expected: {hits} of {len(corpus)}")
+
+
+if __name__ == "__main__":
+    main()
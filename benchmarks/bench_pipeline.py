@@ -0,0 +1,208 @@
+"""End-to-end extraction benchmark over the stored Gmail message corpus, fully offline.
+
+Replays corpus/messages.jsonl through the code /process_emails runs per message:
+app._extract_message (MIME walk, ICS parser, rules, with the Gemini/NER fallbacks
+deferred), one resolve_deferred call per pass for the deferred ones, app._settle,
+and the DB layer (save_events once per pass, then get_events_by_message_ids as a
+re-sync would). The HF NER endpoint is the local stub server and Gemini (with --llm)
+the offline stub model; the DB is a temporary SQLite file.
+
+Reports emails/sec, p50/p95 per stage, peak memory (tracemalloc, measured in a
+separate pass so it does not slow the timed runs) and accuracy against the
+labels. Sub-stages recorded through metrics.timed (mime_walk, ics_parse, clean_text,
+rules, dates, venue, ner, llm) are listed with their mean time per call.
+
+--save writes the numbers as JSON; --compare reads such a file and exits with
+status 1 if throughput dropped or p95 grew by more than --tolerance, so the
+script can gate a deploy.
+
+Usage: python -m benchmarks.bench_pipeline [--repeat 5] [--ner-latency 0.0] [--llm]
+                                           [--save out.json] [--compare base.json] [--tolerance 0.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+os.environ.setdefault("LLM_CACHE_DB", "")  # measure the calls, not the shared cache
+
+import db_utils
+
+# Before anything imports app or llm_fallback, which take their cache paths from DB_NAME
+db_utils.DB_NAME = os.path.join(tempfile.mkdtemp(prefix="bench_pipeline_"), "events.db")
+
+import app
+import hf_client
+import metrics
+from benchmarks.common import load_corpus
+from benchmarks.hf_stub import StubConfig, start_stub_server
+from extractor import is_event_like, resolve_deferred
+
+# extract is per message; the others once per pass over the corpus
+STAGES = ("extract", "resolve", "db_write", "db_lookup", "total")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def process(record: Dict[str, Any], timings: Dict[str, List[float]], deferred: List[Any]) -> Dict[str, Any]:
+    """One message through app._extract_message; a pending fallback is queued in `deferred`."""
+    message = record["message"]
+    start = time.perf_counter()
+    subject, result, fallback = app._extract_message(message)
+    timings["extract"].append(time.perf_counter() - start)
+    if fallback is not None:
+        deferred.append((message["id"], result, fallback))
+    return {"subject": subject, "result": result}
+
+
+def run(corpus: List[Dict[str, Any]], user: str) -> Dict[str, Any]:
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    start = time.perf_counter()
+    deferred: List[Any] = []
+    extracted = [process(record, timings, deferred) for record in corpus]
+    mark = time.perf_counter()
+    resolve_deferred(deferred)
+    timings["resolve"].append(time.perf_counter() - mark)
+    to_save: List[Any] = []
+    # _settle logs every non-event; keep those lines out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for record, item in zip(corpus, extracted):
+            app._settle(user, record["message"]["id"], item["subject"], item["result"], to_save, [])
+    mark = time.perf_counter()
+    db_utils.save_events(to_save)
+    timings["db_write"].append(time.perf_counter() - mark)
+    mark = time.perf_counter()
+    db_utils.get_events_by_message_ids(user, [record["message"]["id"] for record in corpus])
+    timings["db_lookup"].append(time.perf_counter() - mark)
+    elapsed = time.perf_counter() - start
+    timings["total"].append(elapsed)
+    return {"elapsed": elapsed, "timings": timings, "results": [item["result"] for item in extracted]}
+
+
+def accuracy(corpus: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Dict[str, float]:
+    hits = {"date": 0, "time": 0, "venue": 0, "is_event": 0}
+    for record, result in zip(corpus, results):
+        expected = record["expected"]
+        hits["date"] += (expected.get("date") or None) == (result.get("date") or None)
+        hits["time"] += (expected.get("time") or None) == (result.get("time") or None)
+        hits["venue"] += (expected.get("venue") or "").lower() == (result.get("venue") or "").lower()
+        hits["is_event"] += bool(expected.get("is_event")) == is_event_like(result, minimum_required=2)
+    return {field: round(count / len(corpus), 3) for field, count in hits.items()}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    if current["emails_per_sec"] < baseline["emails_per_sec"] * (1 - tolerance):
+        regressions.append(f"emails/sec {baseline['emails_per_sec']:.0f} -> {current['emails_per_sec']:.0f}")
+    for stage, row in current["stages"].items():
+        before = baseline["stages"].get(stage, {}).get("p95_ms")
+        # Sub-0.1 ms stages and stages with a handful of samples are mostly timer noise
+        if before and before >= 0.1 and row["calls"] >= 20 and row["p95_ms"] > before * (1 + tolerance):
+            regressions.append(f"{stage} p95 {before:.2f} -> {row['p95_ms']:.2f} ms")
+    for field, value in current["accuracy"].items():
+        if value < baseline["accuracy"].get(field, 0.0):
+            regressions.append(f"{field} accuracy {baseline['accuracy'][field]} -> {value}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes over the corpus")
+    parser.add_argument("--ner-latency", type=float, default=0.0, help="simulated HF model latency per request")
+    parser.add_argument("--llm", action="store_true", help="enable the Gemini fallback against the offline stub")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--save", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON from --save; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    corpus = load_corpus("messages.jsonl")
+    config = StubConfig("ok", latency=args.ner_latency)
+    server, url = start_stub_server(config)
+    hf_client.HF_API_URL = url
+    llm = None
+    if args.llm:
+        import llm_fallback as llm
+        from benchmarks.gemini_stub import StubGeminiModel, install
+        os.environ["LLM_FALLBACK_ENABLED"] = "true"
+        install(llm, StubGeminiModel(args.llm_latency, 0.0))
+
+    def fresh_llm_cache():
+        # Every pass pays for its Gemini calls instead of replaying the previous pass's answers
+        if llm is not None:
+            llm.LLM_CACHE = llm.cache_from_env("gemini", "LLM_CACHE")
+
+    db_utils.init_db()
+
+    run(corpus, "warmup@example.com")  # imports, regex compilation, stub connection
+    runs = []
+    with metrics.profile_request() as profile:
+        for i in range(args.repeat):
+            fresh_llm_cache()
+            runs.append(run(corpus, f"user{i}@example.com"))
+    fresh_llm_cache()
+    tracemalloc.start()
+    run(corpus, "memory@example.com")
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    server.shutdown()
+
+    emails = len(corpus) * len(runs)
+    elapsed = sum(r["elapsed"] for r in runs)
+    stages = {}
+    for stage in STAGES:
+        values = [v for r in runs for v in r["timings"][stage]]
+        if values:
+            stages[stage] = {
+                "calls": len(values),
+                "p50_ms": round(_percentile(values, 0.5) * 1000, 3),
+                "p95_ms": round(_percentile(values, 0.95) * 1000, 3),
+            }
+    report = {
+        "emails": emails,
+        "emails_per_sec": round(emails / elapsed, 1),
+        "stages": stages,
+        "substages_mean_ms": {
+            stage: round(v["ms"] / v["calls"], 3)
+            for stage, v in profile.breakdown().items() if stage not in STAGES
+        },
+        "peak_memory_kb": round(peak_bytes / 1024, 1),
+        "accuracy": accuracy(corpus, runs[-1]["results"]),
+        "hf_requests": config.requests,
+    }
+
+    print(f"{len(corpus)} messages x {len(runs)} passes: {report['emails_per_sec']:.0f} emails/sec")
+    print(f"{'stage':>12} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage, row in stages.items():
+        print(f"{stage:>12} {row['calls']:>6} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f}")
+    print(f"  sub-stages, mean ms/call: {report['substages_mean_ms']}")
+    print(f"  peak memory (one pass): {report['peak_memory_kb']:.0f} KiB")
+    print(f"  accuracy: {report['accuracy']}")
+    print(f"  HF stub requests: {config.requests}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"  REGRESSION: {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"  no regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
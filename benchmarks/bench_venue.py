@@ -0,0 +1,98 @@
+"""Per-email CPU time of the precompiled time/venue engine vs the previous per-call regex code.
+
+Usage: python -m benchmarks.bench_venue [--repeat 5]
+"""
+import argparse
+import re
+from typing import List, Optional
+
+from benchmarks.common import load_corpus, time_per_item
+from extractor import VENUE_KEYWORDS, _clean_text, _extract_best_time, _extract_date_and_time, extract_venue
+
+_LEGACY_VENUE_REGEX = re.compile(
+    r"\b(?:Hall|Room|Block|Building|Centre|Center|Auditorium|Stadium|Theatre|Theater|Lab|Library|Gym|Campus|Park|Ground|Lawn|Conference Room|Seminar Hall)"
+    r"(?:[ \t]+[A-Za-z0-9&\-]+){0,5}",
+    re.IGNORECASE
+)
+
+
+def legacy_extract_best_time(text: str) -> Optional[str]:
+    if not text:
+        return None
+    for pattern, groups in (
+        (r"\b(\d{1,2})(?::([0-5]\d))?\s*[\-–—to]+\s*(\d{1,2})(?::([0-5]\d))?\s*(AM|PM)\b", (1, 2, 5)),
+        (r"\b(\d{1,2})(?::([0-5]\d))?\s*(AM|PM)\b", (1, 2, 3)),
+    ):
+        m = re.compile(pattern, re.IGNORECASE).search(text)
+        if m:
+            hh, mm, ampm = int(m.group(groups[0])), int(m.group(groups[1]) or 0), m.group(groups[2]).upper()
+            if ampm == "PM" and hh < 12:
+                hh += 12
+            if ampm == "AM" and hh == 12:
+                hh = 0
+            return f"{hh:02d}:{mm:02d}"
+    m = re.compile(r"\b(\d{1,2}):([0-5]\d)\b").search(text)
+    if m and 0 <= int(m.group(1)) <= 23:
+        return f"{int(m.group(1)):02d}:{int(m.group(2)):02d}"
+    return None
+
+
+def legacy_extract_venue(text: str, anchor_line_index: Optional[int] = None) -> Optional[str]:
+    candidates: List[str] = []
+    lines = [l.strip() for l in (text or "").splitlines() if l.strip()]
+    for l in lines:
+        lower = l.lower()
+        if any(lower.startswith(p) for p in ("venue:", "where:", "location:", "address:")):
+            candidates.append(re.sub(r"^(venue:|where:|location:|address:)\s*", "", lower, flags=re.IGNORECASE).strip())
+    for match in _LEGACY_VENUE_REGEX.findall(text or ""):
+        if match.strip():
+            candidates.append(match.strip())
+    if anchor_line_index is not None and 0 <= anchor_line_index < len(lines):
+        for l in lines[max(0, anchor_line_index - 3):min(len(lines), anchor_line_index + 4)]:
+            if any(kw in l.lower() for kw in VENUE_KEYWORDS):
+                candidates.append(l.strip())
+    for i in range(len(candidates)):
+        v = candidates[i]
+        v = re.sub(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", "", v)
+        v = re.sub(r"\bat\s+\d{1,2}(:[0-5]\d)?\s?(AM|PM|am|pm)\b", "", v)
+        v = re.sub(r"\b\d{1,2}(:[0-5]\d)?\s?(AM|PM|am|pm)\b", "", v)
+        v = re.sub(r"\bon\s+\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", "", v)
+        v = re.sub(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", "", v)
+        candidates[i] = v.strip(",;:- ")
+    for v in candidates:
+        if v and len(v) >= 2 and not re.search(r"\d{1,2}[./-]\d{1,2}", v):
+            return v
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pad-lines", type=int, default=0, help="append N newsletter-style lines to every email")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    filler = "".join(
+        f"\nItem {i}: great deals on room heaters and garden park benches, limited stock at 10% off"
+        for i in range(args.pad_lines)
+    )
+    items = []
+    for email in corpus:
+        text = _clean_text(email["body"] + filler)
+        items.append((text, _extract_date_and_time(text)[2]))
+
+    def run(time_fn, venue_fn):
+        return lambda item: (time_fn(item[0]), venue_fn(item[0], anchor_line_index=item[1]))
+
+    old = time_per_item(run(legacy_extract_best_time, legacy_extract_venue), items, repeat=args.repeat)
+    new = time_per_item(run(_extract_best_time, extract_venue), items, repeat=args.repeat)
+    same_time = sum(legacy_extract_best_time(t) == _extract_best_time(t) for t, _ in items)
+    same_venue = sum((legacy_extract_venue(t, a) or "").lower() == (extract_venue(t, a) or "").lower() for t, a in items)
+    print(f"{len(items)} emails")
+    print(f"  legacy: {old * 1e6:8.1f} us/email")
+    print(f"  engine: {new * 1e6:8.1f} us/email  ({old / new:.1f}x)")
+    print(f"  identical results: time {same_time}/{len(items)}, venue {same_venue}/{len(items)} (case-insensitive)")
+
+
+if __name__ == "__main__":
+    main()
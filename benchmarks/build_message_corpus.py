@@ -0,0 +1,126 @@
+"""Build corpus/messages.jsonl: Gmail API message JSON (format=full) with labeled expectations.
+
+Every labeled email in corpus/emails.jsonl becomes one message, rotated through
+the payload shapes the extractor meets in practice:
+  plain    multipart/alternative with a text/plain part
+  html     a single text/html body
+  nested   multipart/mixed > multipart/alternative (plain + html) + a PDF attachment
+  invite   multipart/mixed with a short text/plain part and a text/calendar VEVENT
+A few newsletters and notifications with no event are added, labeled is_event=false.
+
+The output is committed so benchmark runs replay the same bytes; rerun this only
+when emails.jsonl changes.
+
+Usage: python -m benchmarks.build_message_corpus
+"""
+import base64
+import html
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import CORPUS_DIR, load_corpus
+
+_NON_EVENTS = (
+    ("Your weekly digest", "Here are the top stories from your network this week.\nRead more on the app."),
+    ("Password changed", "The password for your account was changed. If this was not you, contact support."),
+    ("Invoice #48213", "Thanks for your purchase. Your invoice total is $42.50.\nPayment method: card ending 4242."),
+    ("Newsletter: spring sale", "<p>Up to <b>40% off</b> garden furniture and room heaters.</p><p>Shop now!</p>"),
+    ("Re: project notes", "Sounds good, I will update the doc and share it with the team."),
+    ("Your order has shipped", "Your package is on its way and should arrive in 3-5 business days."),
+)
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def _part(mime_type: str, text: Optional[str] = None, headers: Optional[List[Dict[str, str]]] = None, **extra) -> Dict[str, Any]:
+    body: Dict[str, Any] = {"size": len(text.encode("utf-8")) if text else 0}
+    if text is not None:
+        body["data"] = _b64(text)
+    return {"partId": "", "mimeType": mime_type, "filename": "", "headers": headers or [], "body": body, **extra}
+
+
+def _to_html(text: str) -> str:
+    if text.startswith("<"):
+        return text
+    paragraphs = "".join(f"<p>{html.escape(line)}</p>" for line in text.split("\n"))
+    return f'<html><head><style>p {{ margin: 0 }}</style></head><body><div class="content">{paragraphs}</div></body></html>'
+
+
+def _ics(subject: str, expected: Dict[str, Optional[str]]) -> str:
+    date = (expected.get("date") or "").replace("-", "")
+    time_ = (expected.get("time") or "").replace(":", "")
+    dtstart = f"DTSTART:{date}T{time_}00" if time_ else f"DTSTART;VALUE=DATE:{date}"
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//bench//corpus//EN", "METHOD:REQUEST", "BEGIN:VEVENT",
+             f"UID:{date}-{zlib.crc32(subject.encode())}@bench", f"SUMMARY:{subject}", dtstart]
+    if expected.get("venue"):
+        lines.append(f"LOCATION:{expected['venue']}")
+    lines += ["END:VEVENT", "END:VCALENDAR"]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def _payload(shape: str, subject: str, body: str, expected: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    if shape == "html":
+        payload = _part("text/html", _to_html(body))
+    elif shape == "nested":
+        alternative = _part("multipart/alternative", parts=[_part("text/plain", body), _part("text/html", _to_html(body))])
+        attachment = _part("application/pdf", filename="agenda.pdf")
+        attachment["body"] = {"attachmentId": "ANGjdJ-bench", "size": 182734}
+        payload = _part("multipart/mixed", parts=[alternative, attachment])
+    elif shape == "invite":
+        payload = _part("multipart/mixed", parts=[
+            _part("text/plain", f"You have been invited to {subject}."),
+            _part("text/calendar", _ics(subject, expected), headers=[{"name": "Content-Type", "value": "text/calendar; method=REQUEST"}]),
+        ])
+    else:
+        payload = _part("multipart/alternative", parts=[_part("text/plain", body)])
+    payload["headers"] = [
+        {"name": "From", "value": "Events Team <events@example.org>"},
+        {"name": "Subject", "value": subject},
+        {"name": "Content-Type", "value": payload["mimeType"]},
+    ] + payload["headers"]
+    return payload
+
+
+def _message(msg_id: str, shape: str, subject: str, body: str, expected: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "shape": shape,
+        "message": {
+            "id": msg_id,
+            "threadId": msg_id,
+            "labelIds": ["UNREAD", "INBOX"],
+            "snippet": body.replace("\n", " ")[:100],
+            "payload": _payload(shape, subject, body, expected),
+        },
+        "expected": expected,
+    }
+
+
+def build() -> List[Dict[str, Any]]:
+    records = []
+    for i, email in enumerate(load_corpus()):
+        expected = dict(email["expected"], is_event=True)
+        # Invites need a date for DTSTART; the rest rotate through the body shapes
+        shape = "invite" if i % 4 == 3 and expected.get("date") else ("plain", "html", "nested")[i % 3]
+        records.append(_message(f"m{email['id']}", shape, email["subject"], email["body"], expected))
+    for i, (subject, body) in enumerate(_NON_EVENTS):
+        shape = "html" if body.startswith("<") else "plain"
+        expected = {"date": None, "time": None, "venue": None, "is_event": False}
+        records.append(_message(f"n{i:03d}", shape, subject, body, expected))
+    return records
+
+
+def main():
+    records = build()
+    path = os.path.join(CORPUS_DIR, "messages.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"wrote {len(records)} messages to {path}")
+
+
+if __name__ == "__main__":
+    main()
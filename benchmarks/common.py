@@ -0,0 +1,23 @@
+"""Shared helpers for the offline benchmarks."""
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def load_corpus(name: str = "emails.jsonl") -> List[Dict[str, Any]]:
+    with open(os.path.join(CORPUS_DIR, name), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def time_per_item(fn: Callable[[Any], Any], items: List[Any], repeat: int = 3) -> float:
+    """Best-of-`repeat` average seconds per item for `fn` over `items`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, (time.perf_counter() - start) / max(1, len(items)))
+    return best
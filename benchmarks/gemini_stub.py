@@ -0,0 +1,92 @@
+"""Offline stand-in for google.generativeai.GenerativeModel.
+
+`StubGeminiModel.generate_content` and `generate_content_async` answer single-email
+prompts with a JSON object and batched prompts (<email id="..."> blocks) with a JSON
+array, using a few regexes instead of a model. Each call sleeps `base_latency` plus
+`per_email_latency` for every email in the prompt, so one call per email and batched
+calls can be compared. Like genai's grpc.aio client, the first async call binds the
+model to its event loop and calls from any other loop fail.
+
+`install(llm_fallback)` swaps the stub in for both the single and the batch model.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+_EMAIL_BLOCK = re.compile(r'<email id="(?P<id>[^"]+)">\n(?P<body>.*?)\n</email>', re.DOTALL)
+_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b|\b(\d{1,2})[./](\d{1,2})[./](\d{4})\b")
+_TIME = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+_VENUE = re.compile(r"\b(?:[Vv]enue|[Ll]ocation|[Ww]here):[ \t]*([^\n]+)")
+
+
+def fake_answer(prompt: str) -> Dict[str, Optional[str]]:
+    date = time_ = venue = None
+    m = _DATE.search(prompt)
+    if m:
+        date = f"{m.group(1)}-{m.group(2)}-{m.group(3)}" if m.group(1) else f"{m.group(6)}-{int(m.group(5)):02d}-{int(m.group(4)):02d}"
+    m = _TIME.search(prompt)
+    if m:
+        time_ = f"{int(m.group(1)):02d}:{m.group(2)}"
+    m = _VENUE.search(prompt)
+    if m:
+        venue = m.group(1).strip()
+    subject = prompt.split("\n", 1)[0].replace("Subject:", "").strip()
+    return {"event_name": subject or None, "date": date, "time": time_, "venue": venue}
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiModel:
+    def __init__(self, base_latency: float = 0.4, per_email_latency: float = 0.05, fail_ids=()):
+        self.base_latency = base_latency
+        self.per_email_latency = per_email_latency
+        self.fail_ids = set(fail_ids)  # batched answers for these ids come back malformed
+        self.calls = 0
+        self.emails = 0
+        self._lock = threading.Lock()
+        self._loop = None
+
+    def _start(self, prompt: str):
+        blocks = list(_EMAIL_BLOCK.finditer(prompt))
+        with self._lock:
+            self.calls += 1
+            self.emails += len(blocks) or 1
+        return blocks, self.base_latency + self.per_email_latency * (len(blocks) or 1)
+
+    def generate_content(self, prompt: str, generation_config: Any = None, request_options: Any = None):
+        blocks, latency = self._start(prompt)
+        time.sleep(latency)
+        return self._answer(prompt, blocks)
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None, request_options: Any = None):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._loop = self._loop or loop
+        if loop is not self._loop:
+            raise RuntimeError("client is bound to a different event loop")
+        blocks, latency = self._start(prompt)
+        await asyncio.sleep(latency)
+        return self._answer(prompt, blocks)
+
+    def _answer(self, prompt: str, blocks):
+        if not blocks:
+            return _Response(json.dumps(fake_answer(prompt)))
+        answers = []
+        for m in blocks:
+            answer = {"id": m.group("id"), **fake_answer(m.group("body"))}
+            if m.group("id") in self.fail_ids:
+                answer["time"] = "around five"
+            answers.append(answer)
+        return _Response(json.dumps(answers))
+
+
+def install(llm_fallback_module, model: StubGeminiModel) -> StubGeminiModel:
+    llm_fallback_module._MODEL = model
+    llm_fallback_module._BATCH_MODEL = model
+    return model
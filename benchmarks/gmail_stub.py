@@ -0,0 +1,135 @@
+"""Offline stand-in for the Gmail REST API.
+
+`StubGmailHttp` implements the small part of the httplib2.Http interface that
+googleapiclient uses, and answers getProfile, messages.list, messages.get,
+history.list and the multipart batch endpoint from an in-memory mailbox.
+Message i of the mailbox was added at historyId i + 1. Every round trip
+sleeps for `latency` seconds so sequential and batched fetching can be compared
+without network access.
+"""
+import base64
+import json
+import time
+from email.parser import Parser
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
+from googleapiclient.discovery import build
+
+
+def make_message(msg_id: str, subject: str, body: str, mime_type: str = "text/plain") -> Dict[str, Any]:
+    data = base64.urlsafe_b64encode(body.encode("utf-8")).decode("ascii")
+    return {
+        "id": msg_id,
+        "threadId": msg_id,
+        "labelIds": ["UNREAD", "INBOX"],
+        "snippet": body[:100],
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [{"name": "Subject", "value": subject}],
+            "parts": [{"mimeType": mime_type, "body": {"size": len(body), "data": data}}],
+        },
+    }
+
+
+def make_mailbox(count: int) -> Dict[str, Dict[str, Any]]:
+    mailbox = {}
+    for i in range(count):
+        msg_id = f"msg{i:05d}"
+        mailbox[msg_id] = make_message(
+            msg_id,
+            f"Tech Talk {i} - 19 Nov 2025 10:00 AM",
+            f"Join us for Tech Talk {i} on 19 Nov 2025 at 10:00 AM in Seminar Hall {i % 5}.",
+        )
+    return mailbox
+
+
+class StubGmailHttp:
+    def __init__(self, mailbox: Dict[str, Dict[str, Any]], latency: float = 0.05, oldest_history_id: int = 0):
+        self.mailbox = mailbox
+        self.latency = latency
+        self.round_trips = 0
+        # history.list answers 404 for start IDs older than this, like an expired Gmail history
+        self.oldest_history_id = oldest_history_id
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urlparse(uri)
+        if parsed.path == "/batch" or parsed.path.startswith("/batch/"):
+            return self._batch(body, headers or {})
+        status, payload = self._dispatch(method, parsed.path, parse_qs(parsed.query))
+        resp = httplib2.Response({"status": status, "content-type": "application/json; charset=UTF-8"})
+        return resp, json.dumps(payload).encode("utf-8")
+
+    def close(self):
+        pass
+
+    def _dispatch(self, method: str, path: str, query: Dict[str, List[str]]):
+        parts = [p for p in path.split("/") if p]
+        if method != "GET" or parts[:4] != ["gmail", "v1", "users", "me"] or len(parts) < 5:
+            return 404, {"error": {"code": 404, "message": f"Unsupported: {method} {path}"}}
+        ids = list(self.mailbox)
+        if parts[4] == "profile":
+            return 200, {"emailAddress": "stub@example.com", "historyId": str(len(ids))}
+        if parts[4] == "history":
+            start = int(query["startHistoryId"][0])
+            if start < self.oldest_history_id:
+                return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+            added = [{"messagesAdded": [{"message": {"id": i, "threadId": i, "labelIds": ["UNREAD", "INBOX"]}}]} for i in ids[start:]]
+            return 200, {"history": added, "historyId": str(len(ids))}
+        if parts[4] != "messages":
+            return 404, {"error": {"code": 404, "message": f"Unsupported: {method} {path}"}}
+        if len(parts) == 5:
+            # Newest first, paged with a numeric offset as the page token
+            ids.reverse()
+            offset = int(query.get("pageToken", ["0"])[0])
+            limit = int(query.get("maxResults", ["100"])[0])
+            page = ids[offset:offset + limit]
+            body = {"messages": [{"id": i, "threadId": i} for i in page], "resultSizeEstimate": len(ids)}
+            if offset + limit < len(ids):
+                body["nextPageToken"] = str(offset + limit)
+            return 200, body
+        msg = self.mailbox.get(parts[5])
+        if msg is None:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        return 200, self._shape(msg, query.get("format", ["full"])[0])
+
+    @staticmethod
+    def _shape(msg: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+        if fmt == "full":
+            return msg
+        shaped = {k: v for k, v in msg.items() if k != "payload"}
+        if fmt == "metadata":
+            shaped["payload"] = {"mimeType": msg["payload"]["mimeType"], "headers": msg["payload"]["headers"]}
+        return shaped
+
+    def _batch(self, body: str, headers: Dict[str, str]):
+        mime = Parser().parsestr(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+        boundary = "batch_stub_boundary"
+        out: List[str] = []
+        for part in mime.get_payload():
+            request_line = part.get_payload().split("\n", 1)[0]
+            method, target, _ = request_line.split(" ", 2)
+            parsed = urlparse(target)
+            status, payload = self._dispatch(method, parsed.path, parse_qs(parsed.query))
+            reason = "OK" if status == 200 else "Not Found"
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            out.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} {reason}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        resp = httplib2.Response({"status": 200, "content-type": f"multipart/mixed; boundary={boundary}"})
+        return resp, "".join(out).encode("utf-8")
+
+
+def build_stub_service(mailbox: Dict[str, Dict[str, Any]], latency: float = 0.05, http: Optional[StubGmailHttp] = None):
+    http = http or StubGmailHttp(mailbox, latency=latency)
+    return build("gmail", "v1", http=http, static_discovery=True), http
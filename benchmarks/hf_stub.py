@@ -0,0 +1,126 @@
+"""Local mock of the Hugging Face Inference API token-classification endpoint.
+
+Answers POST /models/<id> with aggregated entities (DATE, TIME, LOC) found by a few
+regexes, so the NER path can be exercised without network access. `inputs` may be a
+string (one list of entities back) or a list of strings (a list of lists back).
+
+Failure modes for exercising retries and the circuit breaker:
+  ok       every request succeeds after `latency` seconds
+  loading  503 {"error": "Model ... is currently loading", "estimated_time": 20}
+  down     requests hang for `hang` seconds and then get a 500
+  flaky    each request fails with a 502 with probability `fail_rate`
+
+Run standalone:
+  python -m benchmarks.hf_stub --port 8099 --mode ok --latency 0.05
+  HF_API_URL=http://127.0.0.1:8099/models/stub python app.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+_PATTERNS = (
+    ("DATE", re.compile(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b|\b\d{1,2}(?:st|nd|rd|th)?\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\b")),
+    ("TIME", re.compile(r"\b\d{1,2}(?::\d{2})?\s*[AaPp][Mm]\b|\b\d{1,2}:\d{2}\b")),
+    ("LOC", re.compile(r"(?<=\bat )[A-Z][\w&-]*(?: [A-Z][\w&-]*){0,3}")),
+)
+
+
+def fake_entities(text: str) -> List[Dict[str, Any]]:
+    entities = []
+    for group, pattern in _PATTERNS:
+        for m in pattern.finditer(text):
+            entities.append({"entity_group": group, "score": 0.93, "word": m.group(0), "start": m.start(), "end": m.end()})
+    entities.sort(key=lambda e: e["start"])
+    return entities
+
+
+class StubConfig:
+    def __init__(self, mode: str = "ok", latency: float = 0.0, hang: float = 30.0, fail_rate: float = 0.0):
+        self.mode = mode
+        self.latency = latency
+        self.hang = hang
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+def _make_handler(config: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible in `connections`
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def setup(self):
+            super().setup()
+            with config.lock:
+                config.connections += 1
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _reply(self, status: int, body: Any):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client gave up (timed out) before we answered
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            with config.lock:
+                config.requests += 1
+            if config.mode == "down":
+                time.sleep(config.hang)
+                return self._reply(500, {"error": "Internal Server Error"})
+            if config.latency:
+                time.sleep(config.latency)
+            if config.mode == "loading":
+                return self._reply(503, {"error": "Model stub is currently loading", "estimated_time": 20.0})
+            if config.mode == "flaky" and random.random() < config.fail_rate:
+                return self._reply(502, {"error": "Bad Gateway"})
+            inputs = payload.get("inputs")
+            if isinstance(inputs, list):
+                return self._reply(200, [fake_entities(str(t)) for t in inputs])
+            return self._reply(200, fake_entities(str(inputs or "")))
+
+    return Handler
+
+
+def start_stub_server(config: StubConfig, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve in a daemon thread; returns the server and the model URL to use as HF_API_URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/models/stub"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--mode", choices=("ok", "loading", "down", "flaky"), default="ok")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--hang", type=float, default=30.0)
+    parser.add_argument("--fail-rate", type=float, default=0.3)
+    args = parser.parse_args()
+    config = StubConfig(args.mode, args.latency, args.hang, args.fail_rate)
+    server, url = start_stub_server(config, args.port)
+    print(f"HF stub ({args.mode}) listening; set HF_API_URL={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def _key_to_str(key: Hashable) -> str:
+    if isinstance(key, (tuple, list)):
+        return "|".join(str(k) for k in key)
+    return str(key)
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL and an optional shared SQLite tier.
+
+    The in-memory tier is per process. When `db_path` is set, entries are also
+    written to SQLite so every worker (and a restarted worker) sees them.
+    Storing None is a negative result ("looked at, nothing found") and uses
+    `negative_ttl_seconds`. Values must be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        negative_ttl_seconds: Optional[float] = None,
+        db_path: Optional[str] = None,
+        db_max_entries: Optional[int] = None,
+    ):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.negative_ttl_seconds = float(ttl_seconds if negative_ttl_seconds is None else negative_ttl_seconds)
+        self.db_path = db_path or None
+        self.db_max_entries = int(db_max_entries or self.max_entries * 20)
+        self._mem: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.db_path:
+            self._init_db()
+
+    # ---- SQLite tier ----
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " cache TEXT NOT NULL, key TEXT NOT NULL, value TEXT, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (cache, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (cache, expires_at)")
+        conn.commit()
+        conn.close()
+
+    def _db_get(self, skey: str) -> Optional[Tuple[Any, float]]:
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE cache = ? AND key = ?", (self.name, skey)
+            ).fetchone()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache '{self.name}' read failed: {e}")
+            return None
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _db_set(self, skey: str, value: Any, expires_at: float):
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (cache, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, skey, json.dumps(value), expires_at),
+            )
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 100:
+                self._writes_since_prune = 0
+                self._db_prune(conn)
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache '{self.name}' write failed: {e}")
+
+    def _db_prune(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM cache_entries WHERE cache = ? AND expires_at < ?", (self.name, time.time()))
+        # Over the size bound: drop the entries closest to expiry first
+        conn.execute(
+            "DELETE FROM cache_entries WHERE cache = ? AND key IN ("
+            " SELECT key FROM cache_entries WHERE cache = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, self.db_max_entries),
+        )
+
+    # ---- public API ----
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value). A cached negative result is (True, None)."""
+        skey = _key_to_str(key)
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(skey)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._mem.move_to_end(skey)
+                    self._count_hit(entry[0])
+                    return True, entry[0]
+                del self._mem[skey]
+        if self.db_path:
+            entry = self._db_get(skey)
+            if entry is not None:
+                with self._lock:
+                    self._remember(skey, entry[0], entry[1])
+                    self._count_hit(entry[0])
+                return True, entry[0]
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def set(self, key: Hashable, value: Any):
+        skey = _key_to_str(key)
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(skey, value, expires_at)
+        if self.db_path:
+            self._db_set(skey, value, expires_at)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._mem),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remember(self, skey: str, value: Any, expires_at: float):
+        self._mem[skey] = (value, expires_at)
+        self._mem.move_to_end(skey)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _count_hit(self, value: Any):
+        self.hits += 1
+        if value is None:
+            self.negative_hits += 1
+
+
+def cache_from_env(name: str, prefix: str, **defaults: Any) -> TTLCache:
+    """Build a TTLCache configured by <PREFIX>_MAX_ENTRIES, _TTL_SECONDS, _NEGATIVE_TTL_SECONDS and _DB."""
+    def _env(suffix: str, default: Any) -> Any:
+        return os.getenv(f"{prefix}_{suffix}", default)
+
+    return TTLCache(
+        name,
+        max_entries=int(_env("MAX_ENTRIES", defaults.get("max_entries", 5000))),
+        ttl_seconds=float(_env("TTL_SECONDS", defaults.get("ttl_seconds", 7 * 24 * 3600))),
+        negative_ttl_seconds=float(_env("NEGATIVE_TTL_SECONDS", defaults.get("negative_ttl_seconds", 24 * 3600))),
+        db_path=_env("DB", defaults.get("db_path")),
+    )
@@ -0,0 +1,128 @@
+import datetime as _dt
+import os
+import re
+from typing import List, Optional, Tuple
+
+from dateparser.search import search_dates
+
+# "fast" = precompiled patterns first, dateparser only around leftover date-like words;
+# "dateparser" = legacy search_dates over the whole text
+DATE_ENGINE = os.getenv("DATE_ENGINE", "fast").lower()
+# Fixed language set so dateparser skips language detection
+DATE_LANGUAGES = [l.strip() for l in os.getenv("DATE_LANGUAGES", "en").split(",") if l.strip()]
+# Characters of context kept on each side of a date-like word for the dateparser fallback
+FALLBACK_WINDOW = 40
+
+_DATEPARSER_SETTINGS = {
+    "RETURN_AS_TIMEZONE_AWARE": False,
+    "PREFER_DATES_FROM": "future",
+    "DATE_ORDER": "DMY",  # Handle DD.MM.YYYY format better
+    "PREFER_DAY_OF_MONTH": "first",
+}
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_WEEKDAY = r"(?:(?:mon|tue|tues|wed|weds|thu|thur|thurs|fri|sat|sun)\.?|(?:mon|tues|wednes|thurs|fri|satur|sun)day),?\s+"
+_MONTH = (
+    r"(?P<{0}>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+_DAY = r"(?P<{0}>[0-3]?\d)(?:st|nd|rd|th)?"
+
+DATE_PATTERN = re.compile(
+    # 2025-11-19 (optionally followed by a time, which is ignored here)
+    r"\b(?P<iso_y>\d{4})-(?P<iso_m>[01]?\d)-(?P<iso_d>[0-3]?\d)\b"
+    # 19.11.2025, 19/11/25, 19-11-2025 (day first, like DATE_ORDER=DMY)
+    r"|\b(?P<num_d>[0-3]?\d)(?P<sep>[./-])(?P<num_m>[01]?\d)(?P=sep)(?P<num_y>\d{4}|\d{2})\b"
+    # [Wednesday,] 19[th] [of] Nov[ember] [2025]
+    rf"|\b(?:{_WEEKDAY})?{_DAY.format('dm_d')}(?:\s+of)?\s+{_MONTH.format('dm_m')}(?:,?\s+(?P<dm_y>\d{{4}}))?\b"
+    # [Wednesday,] Nov[ember] 19[th][,] [2025]
+    rf"|\b(?:{_WEEKDAY})?{_MONTH.format('md_m')}\s+{_DAY.format('md_d')}(?:,?\s+(?P<md_y>\d{{4}}))?\b",
+    re.IGNORECASE,
+)
+
+# Words dateparser can still resolve when no explicit date matched
+DATE_HINT_PATTERN = re.compile(
+    r"\b(?:today|tonight|tomorrow|day after tomorrow|next (?:week|month)"
+    r"|(?:this|next|coming)\s+(?:mon|tues|wednes|thurs|fri|satur|sun)day"
+    r"|(?:mon|tues|wednes|thurs|fri|satur|sun)day"
+    r"|january|february|march|april|june|july|august|september|october|november|december"
+    r"|in \d+ (?:days?|weeks?))\b",
+    re.IGNORECASE,
+)
+
+
+def _build_date(year: Optional[str], month: int, day: str, now: _dt.datetime) -> Optional[_dt.datetime]:
+    try:
+        if year:
+            y = int(year)
+            if y < 100:
+                y += 2000
+            if not 1900 <= y <= 2100:
+                return None
+            return _dt.datetime(y, month, int(day))
+        # No year: next occurrence from today, like PREFER_DATES_FROM=future
+        candidate = _dt.datetime(now.year, month, int(day))
+        if candidate.date() < now.date():
+            candidate = candidate.replace(year=now.year + 1)
+        return candidate
+    except ValueError:
+        return None
+
+
+def _fast_dates(text: str, now: _dt.datetime) -> List[Tuple[str, _dt.datetime]]:
+    found: List[Tuple[str, _dt.datetime]] = []
+    for m in DATE_PATTERN.finditer(text):
+        g = m.groupdict()
+        if g["iso_y"]:
+            dt = _build_date(g["iso_y"], int(g["iso_m"]), g["iso_d"], now)
+        elif g["num_d"]:
+            dt = _build_date(g["num_y"], int(g["num_m"]), g["num_d"], now) if 1 <= int(g["num_m"]) <= 12 else None
+        elif g["dm_d"]:
+            dt = _build_date(g["dm_y"], _MONTHS[g["dm_m"][:3].lower()], g["dm_d"], now)
+        else:
+            dt = _build_date(g["md_y"], _MONTHS[g["md_m"][:3].lower()], g["md_d"], now)
+        if dt is not None:
+            found.append((m.group(0), dt))
+    return found
+
+
+def _fallback_windows(text: str) -> List[str]:
+    spans: List[List[int]] = []
+    for m in DATE_HINT_PATTERN.finditer(text):
+        start = max(0, m.start() - FALLBACK_WINDOW)
+        end = min(len(text), m.end() + FALLBACK_WINDOW)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return [text[s:e] for s, e in spans]
+
+
+def search_dates_full(text: str) -> List[Tuple[str, _dt.datetime]]:
+    """Legacy path: dateparser over the whole text with language detection."""
+    try:
+        return search_dates(text, settings=_DATEPARSER_SETTINGS) or []
+    except Exception:
+        return []
+
+
+def find_dates(text: str, engine: Optional[str] = None) -> List[Tuple[str, _dt.datetime]]:
+    """Return (matched text, datetime) pairs in text order, like dateparser.search_dates."""
+    if not text:
+        return []
+    if (engine or DATE_ENGINE) == "dateparser":
+        return search_dates_full(text)
+    found = _fast_dates(text, _dt.datetime.now())
+    if found:
+        return found
+    results: List[Tuple[str, _dt.datetime]] = []
+    for window in _fallback_windows(text):
+        try:
+            results.extend(search_dates(window, languages=DATE_LANGUAGES, settings=_DATEPARSER_SETTINGS) or [])
+        except Exception:
+            continue
+    return results
@@ -1,10 +1,63 @@
+import calendar
+import os
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 
 DB_NAME = 'events.db'
+# WAL lets readers run alongside the single writer; NORMAL only syncs at checkpoints, which is safe under WAL
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+# How long a writer waits for the lock before "database is locked"
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+# Rows removed per transaction by delete_expired_events, so other writers get the lock in between
+DB_CLEANUP_BATCH_SIZE = int(os.getenv("DB_CLEANUP_BATCH_SIZE", "1000"))
+# Incremental syncs give up on a message that failed (Gmail error, extraction error) after this many attempts
+SYNC_RETRY_MAX_ATTEMPTS = int(os.getenv("SYNC_RETRY_MAX_ATTEMPTS", "5"))
+
+# One persistent connection per thread (sqlite3 connections must stay on the thread that made them)
+_LOCAL = threading.local()
+_INIT_LOCK = threading.Lock()
+_INITIALIZED = set()
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f'PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA journal_mode = {DB_JOURNAL_MODE}')
+    conn.execute(f'PRAGMA synchronous = {DB_SYNCHRONOUS}')
+    return conn
+
+def get_connection():
+    """This thread's connection to DB_NAME, opened (and the schema created) on first use."""
+    conns = getattr(_LOCAL, "conns", None)
+    if conns is None:
+        conns = _LOCAL.conns = {}
+    conn = conns.get(DB_NAME)
+    if conn is None:
+        if DB_NAME not in _INITIALIZED:
+            init_db()
+        conn = conns[DB_NAME] = _connect(DB_NAME)
+    return conn
+
+def close_connection():
+    """Close this thread's connections, e.g. at the end of a request or worker thread."""
+    for conn in getattr(_LOCAL, "conns", {}).values():
+        conn.close()
+    _LOCAL.conns = {}
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
+    """Create or migrate the schema; runs once per database file per process."""
+    with _INIT_LOCK:
+        if DB_NAME in _INITIALIZED:
+            return
+        conn = _connect(DB_NAME)
+        try:
+            _create_schema(conn)
+        finally:
+            conn.close()
+        _INITIALIZED.add(DB_NAME)
+
+def _create_schema(conn):
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS events (
@@ -13,41 +66,169 @@ def init_db():
             date TEXT,
             time TEXT,
             venue TEXT,
-            reminder_set_at TEXT
+            reminder_set_at TEXT,
+            user TEXT,
+            message_id TEXT,
+            start_ts INTEGER,
+            all_day INTEGER NOT NULL DEFAULT 0,
+            source TEXT,
+            confidence REAL,
+            event_index INTEGER NOT NULL DEFAULT 0,
+            is_primary INTEGER NOT NULL DEFAULT 1,
+            recurring INTEGER
+        )
+    ''')
+    # Older databases were created before user/message_id/start_ts/all_day/source/confidence/event_index existed
+    existing = {row[1] for row in c.execute('PRAGMA table_info(events)')}
+    for column in ("user", "message_id"):
+        if column not in existing:
+            c.execute(f'ALTER TABLE events ADD COLUMN {column} TEXT')
+    backfill = "start_ts" not in existing or "all_day" not in existing
+    if "start_ts" not in existing:
+        c.execute('ALTER TABLE events ADD COLUMN start_ts INTEGER')
+    if "all_day" not in existing:
+        c.execute('ALTER TABLE events ADD COLUMN all_day INTEGER NOT NULL DEFAULT 0')
+        c.execute('ALTER TABLE events ADD COLUMN source TEXT')
+        c.execute('DROP INDEX IF EXISTS idx_events_start_ts')
+    if backfill:
+        _backfill_start_ts(c)
+    if "confidence" not in existing:
+        c.execute('ALTER TABLE events ADD COLUMN confidence REAL')
+    if "event_index" not in existing:
+        # Existing rows are single-event messages: their one row is the primary one
+        c.execute('ALTER TABLE events ADD COLUMN event_index INTEGER NOT NULL DEFAULT 0')
+        c.execute('ALTER TABLE events ADD COLUMN is_primary INTEGER NOT NULL DEFAULT 1')
+        c.execute('ALTER TABLE events ADD COLUMN recurring INTEGER')
+    indexes = {row[1] for row in c.execute('PRAGMA index_list(events)')}
+    if "idx_events_user_message_event_unique" not in indexes:
+        # Keep the first copy of anything saved twice before the key existed, then enforce it
+        c.execute('''
+            DELETE FROM events WHERE message_id IS NOT NULL AND id NOT IN (
+                SELECT MIN(id) FROM events WHERE message_id IS NOT NULL GROUP BY user, message_id, event_index
+            )
+        ''')
+        c.execute('DROP INDEX IF EXISTS idx_events_user_message')
+        c.execute('DROP INDEX IF EXISTS idx_events_user_message_unique')
+        # One row per event of a message (an invite can hold several VEVENTs or occurrences)
+        c.execute('CREATE UNIQUE INDEX idx_events_user_message_event_unique ON events (user, message_id, event_index)')
+    # Cleanup only expires timed events; all-day rows stay out of its index
+    c.execute('CREATE INDEX IF NOT EXISTS idx_events_start_ts ON events (start_ts) WHERE all_day = 0')
+    # /events pages through one user's events by (start_ts, id); the rowid rides along in the index
+    c.execute('CREATE INDEX IF NOT EXISTS idx_events_user_start ON events (user, start_ts)')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            user TEXT PRIMARY KEY,
+            history_id TEXT,
+            updated_at TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_retry (
+            user TEXT,
+            message_id TEXT,
+            attempts INTEGER NOT NULL,
+            PRIMARY KEY (user, message_id)
         )
     ''')
     conn.commit()
-    conn.close()
 
-def save_to_db(event):
-    init_db()  # ensure table exists
+def _backfill_start_ts(c, batch_size=1000):
+    """Fill start_ts/all_day of rows saved before those columns existed, with _start_ts like save_events.
+
+    (SQLite's strftime would leave times such as "9:30" NULL and make them all-day.)
+    Rows whose date does not parse stay NULL and are never listed or expired.
+    """
+    last_id = 0
+    while True:
+        rows = c.execute(
+            'SELECT id, date, time FROM events WHERE start_ts IS NULL AND date IS NOT NULL AND id > ? ORDER BY id LIMIT ?',
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        updates = [(*_start_ts(date, time), row_id) for row_id, date, time in rows]
+        c.executemany('UPDATE events SET start_ts = ?, all_day = ? WHERE id = ?', [u for u in updates if u[0] is not None])
+
+def _start_ts(date_str, time_str):
+    """(start as UTC epoch seconds, all_day); all_day when only the date parses, (None, 0) without a date."""
+    try:
+        start = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+        return calendar.timegm(start.timetuple()), 0
+    except (TypeError, ValueError):
+        pass
+    try:
+        return calendar.timegm(datetime.strptime(str(date_str), "%Y-%m-%d").timetuple()), 1
+    except ValueError:
+        return None, 0
+
+_ROW_FIELDS = ("event", "date", "time", "venue")
 
+def _message_events(event):
+    """(event_index, is_primary, fields) for each row a result is stored as.
+
+    A result with "events" (an invite with several VEVENTs or occurrences) stores every
+    entry in order; the one the result itself shows is flagged primary.
+    """
+    others = event.get("events")
+    if not others:
+        return [(0, 1, event)]
+    primary = next(
+        (i for i, other in enumerate(others) if all(other.get(k) == event.get(k) for k in _ROW_FIELDS)), 0
+    )
+    return [(i, int(i == primary), other) for i, other in enumerate(others)]
+
+def save_events(rows):
+    """Insert (event, user, message_id) rows in one transaction; returns {"inserted", "deduplicated"}.
+
+    Each entry of a result's "events" gets its own row. (user, message_id, event_index)
+    is unique, so an email saved before (e.g. again after a restart emptied the result
+    cache) is skipped instead of duplicated.
+    """
     reminder_set_at = datetime.utcnow().isoformat()
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO events (event, date, time, venue, reminder_set_at)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (
-        event['event'],
-        event['date'],
-        event['time'],
-        event['venue'],
-        reminder_set_at
-    ))
-    conn.commit()
-    conn.close()
+    params = [
+        (
+            fields['event'],
+            fields['date'],
+            fields['time'],
+            fields['venue'],
+            reminder_set_at,
+            user,
+            message_id,
+            *_start_ts(fields['date'], fields['time']),
+            fields.get('source'),
+            fields.get('confidence'),
+            event_index,
+            is_primary,
+            None if fields.get('recurring') is None else int(fields['recurring'])
+        )
+        for event, user, message_id in rows
+        for event_index, is_primary, fields in _message_events(event)
+    ]
+    if not params:
+        return {"inserted": 0, "deduplicated": 0}
+    conn = get_connection()
+    with conn:
+        cur = conn.executemany('''
+            INSERT INTO events (
+                event, date, time, venue, reminder_set_at, user, message_id, start_ts, all_day, source, confidence,
+                event_index, is_primary, recurring
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user, message_id, event_index) DO NOTHING
+        ''', params)
+    return {"inserted": cur.rowcount, "deduplicated": len(params) - cur.rowcount}
 
-def get_all_events():
-    """Return all saved events from the DB as a list of dicts."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute('SELECT event, date, time, venue, reminder_set_at FROM events')
-    rows = c.fetchall()
-    conn.close()
+def save_to_db(event, user=None, message_id=None):
+    """Save one event; False if this user's message was already saved."""
+    return save_events([(event, user, message_id)])["inserted"] > 0
 
+def get_all_events():
+    """Return all saved events from the DB as a list of dicts (prefer iter_events for large tables)."""
     events = []
-    for event, date, time, venue, reminder_set_at in rows:
+    for event, date, time, venue, reminder_set_at in get_connection().execute(
+        'SELECT event, date, time, venue, reminder_set_at FROM events'
+    ):
         events.append({
             "event": event,
             "date": date,
@@ -57,28 +238,147 @@ def get_all_events():
         })
     return events
 
-def delete_expired_events():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+def iter_events(user, start_from=None, start_to=None, source=None, after=None, limit=None):
+    """Yield `user`'s events ordered by (start_ts, id), streaming rows from the cursor.
 
-    # Assuming you want to delete reminders older than 1 day after the event date + time
-    now = datetime.utcnow()
+    `start_from` / `start_to` are UTC epoch seconds (inclusive / exclusive). `source` (a
+    plain word) matches one step of the stored path, so "gemini" also matches "rules+gemini".
+    `after` is the (start_ts, id) of the last row already seen (keyset pagination);
+    events without a date are not listed. Each dict carries its "start_ts" and "id".
+    """
+    clauses = ['user = ?', 'start_ts IS NOT NULL']
+    params = [user]
+    if start_from is not None:
+        clauses.append('start_ts >= ?')
+        params.append(int(start_from))
+    if start_to is not None:
+        clauses.append('start_ts < ?')
+        params.append(int(start_to))
+    if after is not None:
+        clauses.append('(start_ts, id) > (?, ?)')
+        params.extend([int(after[0]), int(after[1])])
+    if source:
+        clauses.append("('+' || source || '+') LIKE ?")
+        params.append(f"%+{source}+%")
+    sql = (
+        'SELECT id, event, date, time, venue, source, all_day, start_ts FROM events '
+        f'WHERE {" AND ".join(clauses)} ORDER BY start_ts, id'
+    )
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(int(limit))
+    for event_id, event, date, time, venue, source_path, all_day, start_ts in get_connection().execute(sql, params):
+        yield {
+            "id": event_id,
+            "event": event,
+            "event_name": event,
+            "date": date,
+            "time": time,
+            "venue": venue,
+            "source": source_path,
+            "all_day": bool(all_day),
+            "start_ts": start_ts,
+        }
 
-    # Convert date + time strings to datetime for comparison
-    c.execute('SELECT id, date, time FROM events')
-    all_events = c.fetchall()
+def get_events_by_message_ids(user, message_ids):
+    """Return {message_id: event dict} for messages of `user` that already have a saved event.
 
+    The dicts have the fields app._settle gives a fresh extraction, so a re-sync
+    answers with the same shape whether a message was cached, stored or extracted:
+    a message stored as several rows comes back as its primary event with all of
+    them under "events". If cleanup removed the primary row, the first remaining one
+    stands in for it.
+    """
+    if not message_ids:
+        return {}
+    c = get_connection().cursor()
+    found = {}
+    ids = list(message_ids)
+    # Stay well below SQLite's bound-parameter limit
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(
+            'SELECT message_id, is_primary, event, date, time, venue, source, confidence, recurring FROM events '
+            f'WHERE user = ? AND message_id IN ({placeholders}) ORDER BY message_id, event_index',
+            [user] + chunk
+        )
+        grouped = {}
+        for message_id, is_primary, event, date, time, venue, source, confidence, recurring in c.fetchall():
+            row = {
+                "event": event,
+                "event_name": event,
+                "date": date,
+                "time": time,
+                "venue": venue,
+                # Rows saved before the source column existed only say where they came from now
+                "source": source or "db",
+                "confidence": confidence,
+            }
+            if recurring is not None:
+                row["recurring"] = bool(recurring)
+            grouped.setdefault(message_id, []).append((is_primary, row))
+        for message_id, rows in grouped.items():
+            result = dict(next((row for is_primary, row in rows if is_primary), rows[0][1]))
+            if len(rows) > 1:
+                result["events"] = [row for _, row in rows]
+            # Same legacy rule as app._settle
+            if result["date"] and result["time"] and result["venue"]:
+                result["attendees"] = 1
+            found[message_id] = result
+    return found
+
+def delete_expired_events(now=None, batch_size=None):
+    """Delete timed events that started more than an hour before `now` (UTC); returns the deleted ids.
+
+    Runs as indexed range deletes on start_ts, `batch_size` rows per transaction.
+    All-day events (no usable time) are kept, as they always were.
+    """
+    cutoff = calendar.timegm((now or datetime.utcnow()).timetuple()) - 3600
+    size = max(1, int(batch_size or DB_CLEANUP_BATCH_SIZE))
+    conn = get_connection()
     deleted_ids = []
-    for row in all_events:
-        event_id, date_str, time_str = row
-        try:
-            event_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-            if event_dt + timedelta(hours=1) < now:
-                c.execute('DELETE FROM events WHERE id = ?', (event_id,))
-                deleted_ids.append(event_id)
-        except Exception as e:
-            print(f"⛔ Error parsing datetime: {e}")
+    while True:
+        with conn:
+            ids = [row[0] for row in conn.execute(
+                'SELECT id FROM events WHERE start_ts < ? AND all_day = 0 LIMIT ?', (cutoff, size)
+            )]
+            if ids:
+                conn.execute(f'DELETE FROM events WHERE id IN ({",".join("?" * len(ids))})', ids)
+        deleted_ids.extend(ids)
+        if len(ids) < size:
+            return deleted_ids
 
-    conn.commit()
-    conn.close()
-    return deleted_ids
+def get_history_id(user):
+    """Return the last Gmail historyId stored for `user`, or None if never synced."""
+    row = get_connection().execute('SELECT history_id FROM sync_state WHERE user = ?', (user,)).fetchone()
+    return row[0] if row else None
+
+def get_retry_message_ids(user):
+    """Message ids of `user` that failed during earlier syncs and are still to be retried."""
+    return [row[0] for row in get_connection().execute(
+        'SELECT message_id FROM sync_retry WHERE user = ? ORDER BY rowid', (user,)
+    )]
+
+def set_history_id(user, history_id, failed_ids=()):
+    """Store the historyId a sync reached, together with the messages it could not process.
+
+    `failed_ids` replace the previous retry list, since that list was part of the run;
+    an id that keeps failing is dropped after SYNC_RETRY_MAX_ATTEMPTS attempts.
+    """
+    conn = get_connection()
+    with conn:
+        attempts = dict(conn.execute('SELECT message_id, attempts FROM sync_retry WHERE user = ?', (user,)))
+        conn.execute('DELETE FROM sync_retry WHERE user = ?', (user,))
+        conn.executemany(
+            'INSERT INTO sync_retry (user, message_id, attempts) VALUES (?, ?, ?)',
+            [
+                (user, msg_id, attempts.get(msg_id, 0) + 1)
+                for msg_id in dict.fromkeys(failed_ids)
+                if attempts.get(msg_id, 0) + 1 < SYNC_RETRY_MAX_ATTEMPTS
+            ]
+        )
+        conn.execute('''
+            INSERT INTO sync_state (user, history_id, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(user) DO UPDATE SET history_id = excluded.history_id, updated_at = excluded.updated_at
+        ''', (user, str(history_id), datetime.utcnow().isoformat()))
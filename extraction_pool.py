@@ -0,0 +1,113 @@
+import contextvars
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# Messages extracted in parallel per process (network-bound NER/LLM calls overlap across them)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "4"))
+# >0 moves the CPU-bound rule stage (dateparser/regex) into that many worker processes
+RULES_PROCESSES = int(os.getenv("RULES_PROCESSES", "0"))
+# Max concurrent calls per stage across all threads of this process; 0 = unlimited
+STAGE_LIMITS = {
+    "rules": int(os.getenv("RULES_CONCURRENCY", "0")),
+    "ner": int(os.getenv("NER_CONCURRENCY", "4")),
+    "llm": int(os.getenv("LLM_CONCURRENCY", "4")),
+}
+
+# Wall-clock budget for LLM calls in one interactive mailbox run, counted from its first LLM call; once spent,
+# remaining emails skip the LLM. Background jobs and backlog syncs are not limited. 0 = unlimited
+LLM_REQUEST_BUDGET_SECONDS = float(os.getenv("LLM_REQUEST_BUDGET_SECONDS", "20"))
+
+_SEMAPHORES = {stage: threading.BoundedSemaphore(limit) for stage, limit in STAGE_LIMITS.items() if limit > 0}
+_THREAD_POOL: Optional[ThreadPoolExecutor] = None
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+@contextmanager
+def stage_slot(stage: str):
+    """Hold one of the concurrency slots configured for `stage` while the block runs."""
+    sem = _SEMAPHORES.get(stage)
+    if sem is None:
+        yield
+        return
+    with sem:
+        yield
+
+
+class Deadline:
+    """A time budget shared by every call made on behalf of one request; None seconds = no limit.
+
+    The clock starts at the first check, i.e. the first LLM call, so the Gmail listing and
+    fetching done before it do not eat into the budget.
+    """
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds or None
+        self.expires_at: Optional[float] = None
+
+    def _expiry(self) -> Optional[float]:
+        if self.seconds and self.expires_at is None:
+            self.expires_at = time.monotonic() + self.seconds
+        return self.expires_at
+
+    def remaining(self) -> Optional[float]:
+        expires_at = self._expiry()
+        if expires_at is None:
+            return None
+        return max(0.0, expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        expires_at = self._expiry()
+        return expires_at is not None and time.monotonic() >= expires_at
+
+    def clamp(self, timeout: float) -> float:
+        """`timeout`, shortened so a call started now cannot outlive the deadline."""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+
+
+def _thread_pool() -> ThreadPoolExecutor:
+    global _THREAD_POOL
+    with _POOL_LOCK:
+        if _THREAD_POOL is None:
+            _THREAD_POOL = ThreadPoolExecutor(max_workers=max(1, EXTRACT_WORKERS), thread_name_prefix="extract")
+        return _THREAD_POOL
+
+
+def _process_pool() -> Optional[ProcessPoolExecutor]:
+    global _PROCESS_POOL
+    if RULES_PROCESSES <= 0:
+        return None
+    with _POOL_LOCK:
+        if _PROCESS_POOL is None:
+            # spawn: forking a process that already runs threads can deadlock on inherited locks
+            _PROCESS_POOL = ProcessPoolExecutor(
+                max_workers=RULES_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _PROCESS_POOL
+
+
+def run_cpu_stage(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a picklable CPU-bound function in the rules process pool if enabled, else inline."""
+    pool = _process_pool()
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args).result()
+
+
+def map_ordered(fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Any]:
+    """Apply `fn` to every item on the shared thread pool, yielding results in input order.
+
+    `fn` should handle its own per-item errors; an exception raised by it propagates here.
+    """
+    items = list(items)
+    if EXTRACT_WORKERS <= 1 or len(items) <= 1:
+        return map(fn, items)
+    # Run each item in a copy of the caller's context so request-scoped state (metrics profile) follows it
+    contexts = [contextvars.copy_context() for _ in items]
+    return _thread_pool().map(lambda ctx, item: ctx.run(fn, item), contexts, items)
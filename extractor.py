@@ -2,11 +2,17 @@ import os
 import re
 import json
 from typing import Any, Dict, List, Optional, Tuple
-from bs4 import BeautifulSoup
-from dateparser.search import search_dates
+from date_extract import find_dates
+from html_text import html_to_text, looks_like_html, normalize_lines
 import datetime as _dt
-import requests
+import hf_client
+import ner_local
 import logging
+from extraction_pool import Deadline, stage_slot, run_cpu_stage
+from metrics import timed
+
+# Bump whenever extraction output can change, so cached results from older logic are ignored
+EXTRACTOR_VERSION = "1"
 
 # Debug logging toggle
 DEBUG_NER = os.getenv("DEBUG_NER", "0") not in (None, "", "0", "false", "False")
@@ -56,17 +62,11 @@ def _normalize_time(t: _dt.time) -> str:
 def _clean_text(html_or_text: Optional[str]) -> str:
     if not html_or_text:
         return ""
-    # If it looks like HTML, strip tags conservatively
-    txt = html_or_text
-    if "<" in txt and ">" in txt:
-        try:
-            soup = BeautifulSoup(txt, "html.parser")
-            txt = soup.get_text(" ")
-        except Exception:
-            pass
-    # Collapse whitespace
-    txt = re.sub(r"\s+", " ", txt).strip()
-    return txt
+    # app.py already converts HTML parts; only parse again if real markup is still present
+    if looks_like_html(html_or_text):
+        return html_to_text(html_or_text)
+    # Collapse whitespace within lines; keep line breaks for the venue/anchor-line heuristics
+    return normalize_lines(html_or_text)
 
 def _extract_date_and_time(text: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
     """Extract date and time using a simple, reliable approach."""
@@ -75,16 +75,9 @@ def _extract_date_and_time(text: str) -> Tuple[Optional[str], Optional[str], Opt
     
     lines = [l.strip() for l in text.splitlines() if l.strip()]
     
-    # Step 1: Find the best date using dateparser with better settings
-    try:
-        results = search_dates(text, settings={
-            "RETURN_AS_TIMEZONE_AWARE": False,
-            "PREFER_DATES_FROM": "future",
-            "DATE_ORDER": "DMY",  # Handle DD.MM.YYYY format better
-            "PREFER_DAY_OF_MONTH": "first",
-        }) or []
-    except Exception:
-        results = []
+    # Step 1: Find candidate dates (precompiled patterns first, dateparser only as a fallback)
+    with timed("dates"):
+        results = find_dates(text)
     
     if not results:
         return None, None, None
@@ -107,47 +100,44 @@ def _extract_date_and_time(text: str) -> Tuple[Optional[str], Optional[str], Opt
     
     return date_str, time_str, anchor_idx
 
+# ---------- Precompiled time / venue engine ----------
+# Time candidates in priority order, found in a single scan:
+#   range: "12:30pm - 2pm" (start time, meridiem taken from the end); ampm: "10 AM"; hhmm: "14:30"
+# (?=\d) fails fast on non-digits; [AaPp][Mm] instead of re.IGNORECASE keeps the scan cheap
+TIME_REGEX = re.compile(
+    r"\b(?=\d)(?:"
+    r"(?P<range>(?P<r_h>\d{1,2})(?::(?P<r_m>[0-5]\d))?\s*[\-–—to]+\s*\d{1,2}(?::[0-5]\d)?\s*(?P<r_ap>[AaPp][Mm])\b)"
+    r"|(?P<ampm>(?P<a_h>\d{1,2})(?::(?P<a_m>[0-5]\d))?\s*(?P<a_ap>[AaPp][Mm])\b)"
+    r"|(?P<hhmm>(?P<h_h>\d{1,2}):(?P<h_m>[0-5]\d)\b))"
+)
+
+def _to_24h(hh: int, mm: int, ampm: str) -> str:
+    ampm = ampm.upper()
+    if ampm == "PM" and hh < 12:
+        hh += 12
+    if ampm == "AM" and hh == 12:
+        hh = 0
+    return f"{hh:02d}:{mm:02d}"
+
 def _extract_best_time(text: str) -> Optional[str]:
     """Extract the best time from text using priority order."""
     if not text:
         return None
-    
-    # Priority 1: Time ranges like "12:30pm - 2pm" (take start time)
-    range_pattern = re.compile(r"\b(\d{1,2})(?::([0-5]\d))?\s*[\-–—to]+\s*(\d{1,2})(?::([0-5]\d))?\s*(AM|PM)\b", re.IGNORECASE)
-    m = range_pattern.search(text)
-    if m:
-        hh = int(m.group(1))
-        mm = int(m.group(2) or 0)
-        ampm = m.group(5).upper()
-        if ampm == "PM" and hh < 12:
-            hh += 12
-        if ampm == "AM" and hh == 12:
-            hh = 0
-        return f"{hh:02d}:{mm:02d}"
-    
-    # Priority 2: Explicit AM/PM times
-    ampm_pattern = re.compile(r"\b(\d{1,2})(?::([0-5]\d))?\s*(AM|PM)\b", re.IGNORECASE)
-    m = ampm_pattern.search(text)
-    if m:
-        hh = int(m.group(1))
-        mm = int(m.group(2) or 0)
-        ampm = m.group(3).upper()
-        if ampm == "PM" and hh < 12:
-            hh += 12
-        if ampm == "AM" and hh == 12:
-            hh = 0
-        return f"{hh:02d}:{mm:02d}"
-    
-    # Priority 3: 24-hour format
-    hhmm_pattern = re.compile(r"\b(\d{1,2}):([0-5]\d)\b")
-    m = hhmm_pattern.search(text)
-    if m:
-        hh = int(m.group(1))
-        mm = int(m.group(2))
-        if 0 <= hh <= 23:
-            return f"{hh:02d}:{mm:02d}"
-    
-    return None
+
+    ampm_time = None
+    hhmm_time = None
+    for m in TIME_REGEX.finditer(text):
+        if m.group("range"):
+            # Priority 1: a range beats everything, stop scanning
+            return _to_24h(int(m.group("r_h")), int(m.group("r_m") or 0), m.group("r_ap"))
+        if m.group("ampm"):
+            # Priority 2: explicit AM/PM
+            if ampm_time is None:
+                ampm_time = _to_24h(int(m.group("a_h")), int(m.group("a_m") or 0), m.group("a_ap"))
+        elif hhmm_time is None and 0 <= int(m.group("h_h")) <= 23:
+            # Priority 3: 24-hour format
+            hhmm_time = f"{int(m.group('h_h')):02d}:{m.group('h_m')}"
+    return ampm_time or hhmm_time
 
 
 # ---------- Venue Extraction Using Regex (fallback) ----------
@@ -158,67 +148,66 @@ VENUE_KEYWORDS = [
     "ground", "lawn"
 ]
 
+# Single alternation over VENUE_KEYWORDS (substring match, like `kw in line.lower()`)
+VENUE_KEYWORD_REGEX = re.compile(
+    "|".join(re.escape(kw) for kw in sorted(VENUE_KEYWORDS, key=len, reverse=True)),
+    re.IGNORECASE
+)
+
 VENUE_REGEX = re.compile(
     r"\b(?:Hall|Room|Block|Building|Centre|Center|Auditorium|Stadium|Theatre|Theater|Lab|Library|Gym|Campus|Park|Ground|Lawn|Conference Room|Seminar Hall)"
-    r"(?:\s+[A-Za-z0-9&\-]+){0,5}",
+    r"(?:[ \t]+[A-Za-z0-9&\-]+){0,5}",
     re.IGNORECASE
 )
 
+VENUE_LABEL_REGEX = re.compile(r"^[ \t]*(?:venue|where|location|address):[ \t]*(.*)$", re.IGNORECASE | re.MULTILINE)
+
+# Dates like 27.09.2025 and times like "at 10:00 AM" removed from venue candidates in one pass
+_NUMERIC_DATE = r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b"
+VENUE_STRIP_REGEX = re.compile(
+    _NUMERIC_DATE + r"|(?:\bat\s+)?\b\d{1,2}(?::[0-5]\d)?\s?(?:AM|PM|am|pm)\b"
+)
+VENUE_DATE_CHECK_REGEX = re.compile(r"\d{1,2}[./-]\d{1,2}")
+
 def extract_venue(text: str, anchor_line_index: Optional[int] = None) -> Optional[str]:
     candidates: List[str] = []
-    lines = [l.strip() for l in (text or "").splitlines() if l.strip()]
+    text = text or ""
     # 1) Explicit labels
-    label_prefixes = ("venue:", "where:", "location:", "address:")
-    for l in lines:
-        lower = l.lower()
-        if any(lower.startswith(p) for p in label_prefixes):
-            val = re.sub(r"^(venue:|where:|location:|address:)\s*", "", lower, flags=re.IGNORECASE)
-            candidates.append(val.strip())
+    for m in VENUE_LABEL_REGEX.finditer(text):
+        candidates.append(m.group(1).strip())
     # 2) Regex place-like
-    for match in VENUE_REGEX.findall(text or ""):
+    for match in VENUE_REGEX.findall(text):
         cleaned = match.strip()
         if cleaned:
             candidates.append(cleaned)
     # 3) Proximity heuristic near date/time line
-    if anchor_line_index is not None and 0 <= anchor_line_index < len(lines):
-        start = max(0, anchor_line_index - 3)
-        end = min(len(lines), anchor_line_index + 4)
-        for l in lines[start:end]:
-            if any(kw in l.lower() for kw in VENUE_KEYWORDS):
-                candidates.append(l.strip())
-    # Post-clean
-    for i in range(len(candidates)):
-        v = candidates[i]
-        # Remove date/time patterns more aggressively
-        v = re.sub(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", "", v)  # Remove dates like 27.09.2025
-        v = re.sub(r"\bat\s+\d{1,2}(:[0-5]\d)?\s?(AM|PM|am|pm)\b", "", v)
-        v = re.sub(r"\b\d{1,2}(:[0-5]\d)?\s?(AM|PM|am|pm)\b", "", v)
-        v = re.sub(r"\bon\s+\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", "", v)  # Remove "on 27.09.2025"
-        v = re.sub(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", "", v)  # Remove any remaining dates
-        v = v.strip(",;:- ")
-        candidates[i] = v
-    # Return the first reasonable candidate
+    if anchor_line_index is not None:
+        lines = [l.strip() for l in text.splitlines() if l.strip()]
+        if 0 <= anchor_line_index < len(lines):
+            start = max(0, anchor_line_index - 3)
+            end = min(len(lines), anchor_line_index + 4)
+            for l in lines[start:end]:
+                if VENUE_KEYWORD_REGEX.search(l):
+                    candidates.append(l)
+    # Post-clean, then return the first reasonable candidate
     for v in candidates:
-        if v and len(v) >= 2 and not re.search(r"\d{1,2}[./-]\d{1,2}", v):  # Final check: no date patterns
+        v = VENUE_STRIP_REGEX.sub("", v).strip(",;:- ")
+        if v and len(v) >= 2 and not VENUE_DATE_CHECK_REGEX.search(v):  # Final check: no date patterns
             return v
     return None
 
 
-# ---------- Hugging Face Inference API (primary) ----------
-HF_MODEL_ID = os.getenv("HF_MODEL_ID", "Thiyaga158/Distilbert_Ner_Model_For_Email_Event_Extraction")
-HF_API_URL = f"https://api-inference.huggingface.co/models/{HF_MODEL_ID}"
-
-def _call_hf_ner(text: str, timeout_seconds: int = 8) -> Optional[List[Dict[str, Any]]]:
-    token = os.getenv("HUGGINGFACE_API_TOKEN") or os.getenv("HF_TOKEN")
+# ---------- Hugging Face NER (Inference API, or the in-process model when NER_BACKEND=local) ----------
+def _call_hf_ner(text: str, timeout_seconds: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+    if ner_local.enabled():
+        return ner_local.predict([text])[0]
+    # Pooled session, retries and the circuit breaker live in hf_client
+    _dlog(f"Calling HF Inference API ({'with token' if (os.getenv('HUGGINGFACE_API_TOKEN') or os.getenv('HF_TOKEN')) else 'anonymously'})")
+    resp = hf_client.post_inference(text, timeout_seconds=timeout_seconds)
+    if resp is None:
+        _dlog(f"HF call skipped or failed; breaker={hf_client.BREAKER.state}")
+        return None
     try:
-        headers = {"Accept": "application/json"}
-        if token:
-            headers["Authorization"] = f"Bearer {token}"
-            _dlog("Calling HF Inference API with token")
-        else:
-            _dlog("Calling HF Inference API anonymously (no token)")
-        payload = {"inputs": text, "options": {"wait_for_model": True}}
-        resp = requests.post(HF_API_URL, headers=headers, json=payload, timeout=timeout_seconds)
         _dlog(f"HF response status: {resp.status_code}")
         if resp.status_code != 200:
             try:
@@ -238,10 +227,33 @@ def _call_hf_ner(text: str, timeout_seconds: int = 8) -> Optional[List[Dict[str,
             return data
         return None
     except Exception:
-        _dlog("HF call raised exception; falling back")
+        _dlog("HF response could not be parsed; falling back")
         return None
 
 
+def _call_hf_ner_batch(texts: List[str]) -> List[Optional[List[Dict[str, Any]]]]:
+    """One HF request for several texts; returns one entity list (or None) per text, in order."""
+    if ner_local.enabled():
+        return ner_local.predict(texts)
+    if len(texts) == 1:
+        return [_call_hf_ner(texts[0])]
+    _dlog(f"Calling HF Inference API with a batch of {len(texts)} texts")
+    resp = hf_client.post_inference(texts)
+    if resp is None or resp.status_code != 200:
+        _dlog(f"HF batch skipped or failed; breaker={hf_client.BREAKER.state}")
+        return [None] * len(texts)
+    try:
+        data = resp.json()
+    except Exception:
+        _dlog("HF batch response could not be parsed; falling back")
+        return [None] * len(texts)
+    # A list input comes back as one entity list per input, in the same order
+    if not isinstance(data, list) or len(data) != len(texts) or not all(isinstance(d, list) for d in data):
+        _dlog(f"HF batch response has unexpected shape: {type(data).__name__}")
+        return [None] * len(texts)
+    return data
+
+
 def _aggregate_entities(entities: List[Dict[str, Any]]) -> Dict[str, str]:
     # Merge adjacent tokens of the same entity_group
     if not entities:
@@ -293,10 +305,47 @@ def _aggregate_entities(entities: List[Dict[str, Any]]) -> Dict[str, str]:
     return fields
 
 
+# ---------- Rule stage (top-level so it can run in the rules process pool) ----------
+def run_rule_stage(text: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    # With RULES_PROCESSES > 0 these timings land in the worker process, not in /metrics
+    d, t, anchor_idx = _extract_date_and_time(text)
+    with timed("venue"):
+        v = extract_venue(text, anchor_line_index=anchor_idx)
+    return d, t, v
+
+
+# Emails per Gemini call when the fallback is resolved in batches (1 = one call per email)
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+
+
 # ---------- Main Extraction Function (order toggled by env: LLM_FIRST) ----------
-def extract_event_details(subject: Optional[str], body: Optional[str]) -> Dict[str, Optional[str]]:
+def extract_event_details(
+    subject: Optional[str], body: Optional[str], deadline: Optional[Deadline] = None
+) -> Dict[str, Optional[str]]:
+    result, pending = extract_event_details_deferred(subject, body, deadline=deadline)
+    if pending is not None:
+        with stage_slot("ner"), timed("ner"):
+            ner_entities = _call_hf_ner(pending["text"])
+        _apply_ner_entities(result, ner_entities)
+    return result
+
+
+def extract_event_details_deferred(
+    subject: Optional[str], body: Optional[str], defer_llm: bool = False, deadline: Optional[Deadline] = None
+) -> Tuple[Dict[str, Optional[str]], Optional[Dict[str, Any]]]:
+    """Run the stages that do not need batching; return (result, pending fallback or None).
+
+    NER is always the last fallback and is never run here. With `defer_llm` (and
+    LLM_BATCH_SIZE > 1) the Gemini fallback of the default rules-first order is left
+    pending too. Callers collect pending items of many emails and resolve them
+    together with resolve_deferred. `pending` is {"subject", "text", "llm"}.
+    Gemini is skipped once `deadline` (the request's LLM budget) has passed.
+    Fallbacks that gave no answer (failed, timed out, skipped) are listed in
+    result["unanswered"], so callers can tell a non-event from an unfinished one.
+    """
     raw = body or ""
-    text = _clean_text(raw)
+    with timed("clean_text"):
+        text = _clean_text(raw)
     event_name = clean_event_name(subject)
     llm_first = os.getenv("LLM_FIRST", "false").lower() == "true"
 
@@ -305,11 +354,13 @@ def extract_event_details(subject: Optional[str], body: Optional[str]) -> Dict[s
     venue_rule: Optional[str] = None
     source = ""
     confidence = 0.0
+    llm_pending = False
+    unanswered: List[str] = []
 
     def _apply_rules():
         nonlocal date_str, time_str, venue_rule, source, confidence
-        d, t, anchor_idx = _extract_date_and_time(text)
-        v = extract_venue(text, anchor_line_index=anchor_idx)
+        with stage_slot("rules"), timed("rules"):
+            d, t, v = run_cpu_stage(run_rule_stage, text)
         date_str = date_str or d
         time_str = time_str or t
         venue_rule = venue_rule or v
@@ -318,11 +369,14 @@ def extract_event_details(subject: Optional[str], body: Optional[str]) -> Dict[s
 
     def _apply_llm():
         nonlocal date_str, time_str, venue_rule, source, confidence
-        if os.getenv("LLM_FALLBACK_ENABLED", "false").lower() != "true":
+        if not _llm_enabled():
             return
         try:
             from llm_fallback import extract_with_gemini
-            llm = extract_with_gemini(subject or "", text)
+            with stage_slot("llm"), timed("llm"):
+                llm = extract_with_gemini(subject or "", text, deadline=deadline)
+            if llm is None:
+                unanswered.append("gemini")
             if llm:
                 date_str = date_str or llm.get("date")
                 time_str = time_str or llm.get("time")
@@ -330,51 +384,114 @@ def extract_event_details(subject: Optional[str], body: Optional[str]) -> Dict[s
                 source = "gemini" if not source else f"{source}+gemini"
                 confidence = max(confidence, 0.8)
         except Exception:
-            pass
-
-    def _apply_ner():
-        nonlocal date_str, time_str, venue_rule, source, confidence
-        ner_entities = _call_hf_ner(text)
-        if ner_entities:
-            ner_fields = _aggregate_entities(ner_entities)
-            date_str = date_str or ner_fields.get("date")
-            time_str = time_str or ner_fields.get("time")
-            venue_rule = venue_rule or ner_fields.get("venue")
-            source = "ner" if not source else f"{source}+ner"
-            confidence = max(confidence, 0.7 if count_event_fields({"date": date_str, "time": time_str, "venue": venue_rule}) >= 2 else 0.5)
+            unanswered.append("gemini")
 
     if llm_first:
         _apply_llm()
         if count_event_fields({"date": date_str, "time": time_str, "venue": venue_rule}) < 2:
             _apply_rules()
-        if count_event_fields({"date": date_str, "time": time_str, "venue": venue_rule}) < 2:
-            _apply_ner()
     else:
         _apply_rules()
         if count_event_fields({"date": date_str, "time": time_str, "venue": venue_rule}) < 2:
-            _apply_llm()
-        if count_event_fields({"date": date_str, "time": time_str, "venue": venue_rule}) < 2:
-            _apply_ner()
-
-    # Light normalization of time strings
-    if time_str:
-        t = str(time_str).strip()
-        if re.fullmatch(r"\d{1,2}", t):
-            t = f"{t}:00"
-        t = t.upper().replace(".", "")
-        t = re.sub(r"\s+", " ", t)
-        time_str = t
+            if defer_llm and LLM_BATCH_SIZE > 1 and _llm_enabled():
+                llm_pending = True
+            else:
+                _apply_llm()
 
     result: Dict[str, Optional[str]] = {
         "event": event_name,
         "event_name": event_name,
         "date": date_str,
-        "time": time_str,
+        "time": _normalize_time_str(time_str),
         "venue": venue_rule,
         "source": source,
         "confidence": confidence,
     }
-    return result
+    if unanswered:
+        result["unanswered"] = unanswered
+    if count_event_fields(result) >= 2:
+        return result, None
+    return result, {"subject": subject or "", "text": text, "llm": llm_pending}
+
+
+def _llm_enabled() -> bool:
+    return os.getenv("LLM_FALLBACK_ENABLED", "false").lower() == "true"
+
+
+def _normalize_time_str(time_str: Optional[str]) -> Optional[str]:
+    # Light normalization of time strings
+    if not time_str:
+        return time_str
+    t = str(time_str).strip()
+    if re.fullmatch(r"\d{1,2}", t):
+        t = f"{t}:00"
+    t = t.upper().replace(".", "")
+    return re.sub(r"\s+", " ", t)
+
+
+def _apply_ner_entities(result: Dict[str, Optional[str]], ner_entities: Optional[List[Dict[str, Any]]]):
+    """Fill the fields still missing in `result` from raw NER entities (None: NER gave no answer)."""
+    if ner_entities is None:
+        result.setdefault("unanswered", []).append("ner")
+    if not ner_entities:
+        return
+    ner_fields = _aggregate_entities(ner_entities)
+    result["date"] = result.get("date") or ner_fields.get("date")
+    result["time"] = result.get("time") or _normalize_time_str(ner_fields.get("time"))
+    result["venue"] = result.get("venue") or ner_fields.get("venue")
+    result["source"] = "ner" if not result.get("source") else f"{result['source']}+ner"
+    result["confidence"] = max(result.get("confidence") or 0.0, 0.7 if count_event_fields(result) >= 2 else 0.5)
+
+
+def apply_ner_batch(items: List[Tuple[Dict[str, Optional[str]], str]], batch_size: Optional[int] = None):
+    """Resolve many deferred NER fallbacks with HF_NER_BATCH_SIZE texts per request.
+
+    `items` are (result, text) pairs; each result is updated in place.
+    """
+    size = max(1, int(batch_size or hf_client.HF_NER_BATCH_SIZE))
+    for start in range(0, len(items), size):
+        chunk = items[start:start + size]
+        with stage_slot("ner"), timed("ner_batch"):
+            entity_lists = _call_hf_ner_batch([text for _, text in chunk])
+        for (result, _), ner_entities in zip(chunk, entity_lists):
+            _apply_ner_entities(result, ner_entities)
+
+
+def _apply_llm_batch(items: List[Tuple[str, Dict[str, Optional[str]], Dict[str, Any]]], deadline: Optional[Deadline] = None):
+    """Gemini fallback for many emails: LLM_BATCH_SIZE emails per call, calls made concurrently."""
+    try:
+        from llm_fallback import run_gemini_batches
+    except Exception:
+        return
+    triples = [(item_id, p["subject"], p["text"]) for item_id, _, p in items]
+    chunks = [triples[start:start + LLM_BATCH_SIZE] for start in range(0, len(triples), LLM_BATCH_SIZE)]
+    # In-flight calls are bounded by LLM_CONCURRENCY inside run_gemini_batches
+    with timed("llm_batch"):
+        answers = run_gemini_batches(chunks, deadline=deadline)
+    for item_id, result, _ in items:
+        llm = answers.get(item_id)
+        if llm is None:
+            # Failed, or its chunk was skipped for the budget
+            result.setdefault("unanswered", []).append("gemini")
+        if llm:
+            result["date"] = result.get("date") or llm.get("date")
+            result["time"] = result.get("time") or _normalize_time_str(llm.get("time"))
+            result["venue"] = result.get("venue") or llm.get("venue")
+            result["source"] = "gemini" if not result.get("source") else f"{result['source']}+gemini"
+            result["confidence"] = max(result.get("confidence") or 0.0, 0.8)
+
+
+def resolve_deferred(items: List[Tuple[str, Dict[str, Optional[str]], Dict[str, Any]]], deadline: Optional[Deadline] = None):
+    """Finish (item_id, result, pending) triples from extract_event_details_deferred in place.
+
+    Deferred Gemini fallbacks go first, batched; NER then runs, batched, for whatever
+    still has fewer than two fields. `item_id` must be unique (the Gmail message ID).
+    Batches that have not started when `deadline` passes skip Gemini.
+    """
+    llm_items = [item for item in items if item[2]["llm"]]
+    if llm_items:
+        _apply_llm_batch(llm_items, deadline=deadline)
+    apply_ner_batch([(result, p["text"]) for _, result, p in items if count_event_fields(result) < 2])
 
 
 def count_event_fields(details: Dict[str, Optional[str]]) -> int:
@@ -390,6 +507,24 @@ def is_event_like(details: Dict[str, Optional[str]], minimum_required: int = 2)
     return count_event_fields(details) >= max(0, int(minimum_required))
 
 
+# Cheap check on subject + Gmail snippet, used before downloading a full message body
+EVENT_HINT_REGEX = re.compile(
+    r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t|tember)?"
+    r"|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b"
+    r"|\b(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day)?\b"
+    r"|\b(?:today|tomorrow|tonight|next week)\b"
+    r"|\b\d{1,2}(?::[0-5]\d)?\s*(?:am|pm)\b|\b\d{1,2}:[0-5]\d\b"
+    r"|\b\d{1,4}[./-]\d{1,2}(?:[./-]\d{2,4})?\b"
+    r"|\b(?:event|invite|invitation|meeting|webinar|workshop|seminar|conference|session|summit|hackathon"
+    r"|venue|rsvp|register|registration|reminder|schedule|join us|calendar)\b",
+    re.IGNORECASE,
+)
+
+
+def looks_event_related(subject: Optional[str], snippet: Optional[str]) -> bool:
+    return bool(EVENT_HINT_REGEX.search(f"{subject or ''}\n{snippet or ''}"))
+
+
 # ---------- Test ----------
 if __name__ == "__main__":
     subj = "Re: [Reminder] Climate Action 2025 - 19 Nov 2025 10:00 AM"
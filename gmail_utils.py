@@ -1,10 +1,66 @@
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient import discovery_cache
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
+from typing import Any, Dict, List, Optional, Tuple
+import httplib2
+import json
+import threading
 import os, pickle
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+# Max sub-requests per Gmail batch HTTP call (Gmail allows up to 100, recommends <= 50)
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+# "batch" sends one multipart request per chunk; "sequential" keeps the one-call-per-message loop
+GMAIL_FETCH_MODE = os.getenv("GMAIL_FETCH_MODE", "batch").lower()
+# Optional path to a gmail v1 discovery JSON; defaults to the copy shipped with google-api-python-client
+GMAIL_DISCOVERY_PATH = os.getenv("GMAIL_DISCOVERY_PATH")
+GMAIL_HTTP_TIMEOUT = float(os.getenv("GMAIL_HTTP_TIMEOUT", "30"))
+# "unread" re-lists the newest unread mail on every poll; "incremental" follows users.history from a stored historyId
+GMAIL_SYNC_MODE = os.getenv("GMAIL_SYNC_MODE", "unread").lower()
+# Query used to page through the backlog when a user is first onboarded (or their historyId expired)
+GMAIL_SYNC_QUERY = os.getenv("GMAIL_SYNC_QUERY", "is:unread")
+GMAIL_BACKLOG_LIMIT = int(os.getenv("GMAIL_BACKLOG_LIMIT", "0"))  # 0 = no limit
+
+_DISCOVERY_DOC = None
+_DISCOVERY_LOCK = threading.Lock()
+_THREAD_HTTP = threading.local()
+
+
+def _load_discovery_doc() -> dict:
+    if GMAIL_DISCOVERY_PATH:
+        with open(GMAIL_DISCOVERY_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(discovery_cache.get_static_doc("gmail", "v1"))
+
+
+def _discovery_doc() -> dict:
+    """gmail v1 discovery document, read and parsed once per process."""
+    global _DISCOVERY_DOC
+    if _DISCOVERY_DOC is None:
+        with _DISCOVERY_LOCK:
+            if _DISCOVERY_DOC is None:
+                _DISCOVERY_DOC = _load_discovery_doc()
+    return _DISCOVERY_DOC
+
+
+def _shared_http() -> httplib2.Http:
+    # httplib2.Http is not thread-safe, so keep one keep-alive connection pool per worker thread
+    http = getattr(_THREAD_HTTP, "http", None)
+    if http is None:
+        http = httplib2.Http(timeout=GMAIL_HTTP_TIMEOUT)
+        _THREAD_HTTP.http = http
+    return http
+
+
+def build_gmail_service(creds):
+    """Gmail service for `creds` from the cached discovery document, over the pooled transport."""
+    # Skips build()'s discovery lookup and JSON parse; child resources inherit `http` from the root
+    return build_from_document(_discovery_doc(), http=AuthorizedHttp(creds, http=_shared_http()))
+
 def get_gmail_service():
     creds = None
     if os.path.exists('token.json'):
@@ -14,5 +70,117 @@ def get_gmail_service():
         auth_url, _ = flow.authorization_url(prompt='consent')
         return auth_url, flow
 
-    service = build('gmail', 'v1', credentials=creds)
+    service = build_gmail_service(creds)
     return service
+
+
+def fetch_messages(service, message_ids: List[str], batch_size: Optional[int] = None, **get_kwargs: Any) -> List[Optional[Dict[str, Any]]]:
+    """Fetch many messages with `users.messages.get`, returning results in input order.
+
+    Extra keyword arguments (format, metadataHeaders, ...) are passed to every get call.
+    A message that fails is logged and returned as None, like the per-message loop did.
+    """
+    if not message_ids:
+        return []
+    if GMAIL_FETCH_MODE == "sequential":
+        return _fetch_sequential(service, message_ids, **get_kwargs)
+
+    size = max(1, min(int(batch_size or GMAIL_BATCH_SIZE), 100))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(message_ids)
+
+    def _callback(request_id, response, exception):
+        if exception is not None:
+            print(f"⚠️ Skipping email due to error: {exception}")
+            return
+        results[int(request_id)] = response
+
+    for start in range(0, len(message_ids), size):
+        chunk = message_ids[start:start + size]
+        batch = service.new_batch_http_request(callback=_callback)
+        for offset, msg_id in enumerate(chunk):
+            batch.add(
+                service.users().messages().get(userId="me", id=msg_id, **get_kwargs),
+                request_id=str(start + offset),
+            )
+        try:
+            batch.execute()
+        except Exception as e:
+            # Whole batch failed at the transport level; retry this chunk one message at a time
+            print(f"⚠️ Gmail batch failed, falling back to per-message fetch: {e}")
+            results[start:start + len(chunk)] = _fetch_sequential(service, chunk, **get_kwargs)
+    return results
+
+
+def _fetch_sequential(service, message_ids: List[str], **get_kwargs: Any) -> List[Optional[Dict[str, Any]]]:
+    results: List[Optional[Dict[str, Any]]] = []
+    for msg_id in message_ids:
+        try:
+            results.append(service.users().messages().get(userId="me", id=msg_id, **get_kwargs).execute())
+        except Exception as e:
+            print(f"⚠️ Skipping email due to error: {e}")
+            results.append(None)
+    return results
+
+
+def list_message_ids(service, q: str = "is:unread", max_results: Optional[int] = None, page_size: int = 500) -> List[str]:
+    """Page through `users.messages.list` and return message IDs, newest first."""
+    ids: List[str] = []
+    page_token = None
+    while True:
+        limit = page_size if not max_results else min(page_size, max_results - len(ids))
+        resp = service.users().messages().list(
+            userId="me", q=q, maxResults=limit, pageToken=page_token
+        ).execute()
+        ids.extend(m["id"] for m in resp.get("messages", []))
+        page_token = resp.get("nextPageToken")
+        if not page_token or (max_results and len(ids) >= max_results):
+            return ids
+
+
+def list_history_message_ids(service, start_history_id: str) -> Tuple[List[str], Optional[str]]:
+    """Return IDs of messages added since `start_history_id` and the latest historyId seen.
+
+    Raises HttpError(404) when the start ID is too old for Gmail to serve.
+    """
+    ids: List[str] = []
+    seen = set()
+    latest = None
+    page_token = None
+    while True:
+        resp = service.users().history().list(
+            userId="me", startHistoryId=start_history_id, historyTypes=["messageAdded"], pageToken=page_token
+        ).execute()
+        latest = resp.get("historyId") or latest
+        for record in resp.get("history", []):
+            for added in record.get("messagesAdded", []):
+                msg = added.get("message") or {}
+                labels = msg.get("labelIds") or []
+                # Only mail we received; drafts and our own sent mail never hold invites for us
+                if msg.get("id") in seen or "DRAFT" in labels or "SENT" in labels:
+                    continue
+                seen.add(msg["id"])
+                ids.append(msg["id"])
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            return ids, latest
+
+
+def sync_message_ids(service, last_history_id: Optional[str], profile: Dict[str, Any]) -> Tuple[List[str], str, bool]:
+    """Return (message IDs to process, historyId to store once they have been handled, backlog).
+
+    `backlog` is True when there was no usable historyId and the IDs come from re-listing
+    the mailbox (first sync, or the stored historyId expired).
+
+    `profile` is the users.getProfile response fetched before listing, so mail that
+    arrives while the backlog is being paged is picked up by the next history call.
+    """
+    if last_history_id:
+        try:
+            ids, latest = list_history_message_ids(service, last_history_id)
+            return ids, latest or last_history_id, False
+        except HttpError as e:
+            if getattr(e.resp, "status", None) != 404:
+                raise
+            print(f"ℹ️ historyId {last_history_id} expired; re-listing backlog")
+    ids = list_message_ids(service, q=GMAIL_SYNC_QUERY, max_results=GMAIL_BACKLOG_LIMIT or None)
+    return ids, str(profile.get("historyId")), True
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HF_MODEL_ID = os.getenv("HF_MODEL_ID", "Thiyaga158/Distilbert_Ner_Model_For_Email_Event_Extraction")
+# Override to point at a self-hosted endpoint or the local mock (benchmarks/hf_stub.py)
+HF_API_URL = os.getenv("HF_API_URL") or f"https://api-inference.huggingface.co/models/{HF_MODEL_ID}"
+HF_TIMEOUT_SECONDS = float(os.getenv("HF_TIMEOUT_SECONDS", "8"))
+# Waiting for a cold model holds the caller for the whole timeout; by default a loading model is a fast failure
+HF_WAIT_FOR_MODEL = os.getenv("HF_WAIT_FOR_MODEL", "false").lower() == "true"
+HF_MAX_RETRIES = int(os.getenv("HF_MAX_RETRIES", "2"))
+HF_POOL_SIZE = int(os.getenv("HF_POOL_SIZE", "16"))
+# Texts per NER request when the fallback is resolved in batches
+HF_NER_BATCH_SIZE = int(os.getenv("HF_NER_BATCH_SIZE", "16"))
+# Consecutive failures before NER is skipped, and for how long
+HF_BREAKER_FAILURES = int(os.getenv("HF_BREAKER_FAILURES", "5"))
+HF_BREAKER_COOLDOWN_SECONDS = float(os.getenv("HF_BREAKER_COOLDOWN_SECONDS", "60"))
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and rejects calls for `cooldown_seconds`.
+
+    After the cooldown a single trial call is let through (half-open); its outcome
+    closes the breaker again or restarts the cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"⚠️ HF NER circuit open for {self.cooldown_seconds:.0f}s after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class CallMetrics:
+    """Counters and recent latencies for an outbound call."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._latencies_ms: "deque[float]" = deque(maxlen=window)
+        self.calls = 0
+        self.successes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+
+    def observe(self, outcome: str, latency_ms: Optional[float] = None):
+        with self._lock:
+            if outcome == "short_circuited":
+                self.short_circuited += 1
+                return
+            self.calls += 1
+            if outcome == "success":
+                self.successes += 1
+            elif outcome == "timeout":
+                self.timeouts += 1
+            else:
+                self.errors += 1
+            if latency_ms is not None:
+                self._latencies_ms.append(latency_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latencies_ms)
+            pick = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))], 1) if lat else None
+            return {
+                "calls": self.calls,
+                "successes": self.successes,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "short_circuited": self.short_circuited,
+                "latency_ms_p50": pick(0.5),
+                "latency_ms_p95": pick(0.95),
+                "latency_ms_max": round(lat[-1], 1) if lat else None,
+            }
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(
+        total=HF_MAX_RETRIES,
+        connect=HF_MAX_RETRIES,
+        read=False,  # a read timeout already spent the budget; raise it so the breaker sees it
+        status_forcelist=(429, 502, 504),  # 503 is "model loading": fail fast instead
+        allowed_methods=frozenset({"POST"}),
+        backoff_factor=0.3,
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HF_POOL_SIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+# Shared across extraction threads: one keep-alive connection pool to the inference endpoint
+SESSION = _build_session()
+BREAKER = CircuitBreaker(HF_BREAKER_FAILURES, HF_BREAKER_COOLDOWN_SECONDS)
+METRICS = CallMetrics()
+
+
+def post_inference(inputs: Any, timeout_seconds: Optional[float] = None) -> Optional[requests.Response]:
+    """POST `inputs` to the NER endpoint through the shared session.
+
+    Returns None when the breaker is open or the request raised (timeout, connection
+    error). Non-200 responses are returned so the caller can log them, but count as
+    failures towards the breaker just like timeouts.
+    """
+    if not BREAKER.allow():
+        METRICS.observe("short_circuited")
+        return None
+    headers = {}
+    token = os.getenv("HUGGINGFACE_API_TOKEN") or os.getenv("HF_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    payload = {"inputs": inputs, "options": {"wait_for_model": HF_WAIT_FOR_MODEL}}
+    start = time.perf_counter()
+    try:
+        resp = SESSION.post(HF_API_URL, headers=headers, json=payload, timeout=timeout_seconds or HF_TIMEOUT_SECONDS)
+    except requests.Timeout:
+        METRICS.observe("timeout", (time.perf_counter() - start) * 1000)
+        BREAKER.record_failure()
+        return None
+    except requests.RequestException:
+        METRICS.observe("error", (time.perf_counter() - start) * 1000)
+        BREAKER.record_failure()
+        return None
+    latency_ms = (time.perf_counter() - start) * 1000
+    if resp.status_code != 200:
+        METRICS.observe("error", latency_ms)
+        BREAKER.record_failure()
+        return resp
+    METRICS.observe("success", latency_ms)
+    BREAKER.record_success()
+    return resp
+
+
+def stats() -> Dict[str, Any]:
+    return {"breaker": BREAKER.state, **METRICS.stats()}
@@ -0,0 +1,77 @@
+import os
+import re
+from html import unescape
+
+# Larger HTML bodies are truncated before parsing (marketing mail can be megabytes of markup)
+HTML_TEXT_MAX_CHARS = int(os.getenv("HTML_TEXT_MAX_CHARS", "300000"))
+
+_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "footer",
+    "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "table", "tbody", "thead", "tfoot", "tr", "ul",
+}
+
+# Cheap sniff for real markup; plain-text mail often contains "<https://...>" or "a < b"
+_LOOKS_LIKE_HTML = re.compile(r"<(?:!doctype|html|body|head|div|p|br|span|table|td|tr|a\s|font|img|style|meta)\b", re.IGNORECASE)
+
+
+def _ci(word: str) -> str:
+    # Case-insensitive literal without re.IGNORECASE, which slows down every other position of the scan
+    return "".join(f"[{c.lower()}{c.upper()}]" if c.isalpha() else re.escape(c) for c in word)
+
+
+def _alternation(words) -> str:
+    """Case-insensitive alternation factored by first letter, so each "<" is tried against a few branches."""
+    groups = {}
+    for word in sorted(words):
+        groups.setdefault(word[0], []).append(word[1:])
+    alts = []
+    for first, rests in groups.items():
+        if len(rests) == 1:
+            alts.append(_ci(first + rests[0]))
+            continue
+        inner = _alternation([r for r in rests if r])
+        alts.append(_ci(first) + (f"(?:{inner})?" if "" in rests else f"(?:{inner})"))
+    return "|".join(alts)
+
+
+# Attribute run that skips over quoted values, so alt="Save > 50%" does not end the tag
+_ATTRS = r"""[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*"""
+
+
+def _skip_element(tag: str) -> str:
+    name = _ci(tag)
+    return name + r"\b" + _ATTRS + ">[^<]*(?:<(?!/" + name + r"\s*>)[^<]*)*</" + name + r"\s*>"
+
+
+# Elements dropped with their content, plus comments and doctype
+_SKIP = re.compile(
+    "<(?:"
+    + "|".join(_skip_element(t) for t in ("script", "style", "head", "noscript", "template", "svg"))
+    + r"|!--.*?-->|![^>]*>)",
+    re.DOTALL,
+)
+# Zero-width: only marks where a block element opens or closes; the tag itself goes with _TAG
+_BLOCK_START = re.compile(r"<(?=/?(?:" + _alternation(_BLOCK_TAGS) + r")[\s/>])")
+_TAG = re.compile(r"</?[A-Za-z][A-Za-z0-9]*" + _ATTRS + ">")
+
+
+def normalize_lines(text: str) -> str:
+    """Collapse whitespace inside each line and drop blank lines, keeping line structure."""
+    return "\n".join(filter(None, (" ".join(line.split()) for line in text.split("\n"))))
+
+
+def looks_like_html(text: str) -> bool:
+    return bool(text) and _LOOKS_LIKE_HTML.search(text) is not None
+
+
+def html_to_text(html: str, max_chars: int = HTML_TEXT_MAX_CHARS) -> str:
+    """Convert HTML to plain text: drops script/style, one line per block element."""
+    if not html:
+        return ""
+    if max_chars:
+        html = html[:max_chars]
+    text = _TAG.sub(" ", _BLOCK_START.sub("\n<", _SKIP.sub(" ", html)))
+    if "&" in text:
+        text = unescape(text)
+    return normalize_lines(text)
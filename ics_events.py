@@ -0,0 +1,244 @@
+import datetime as _dt
+import os
+import re
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil.rrule import rruleset, rrulestr
+
+# Timezone assumed for floating DTSTART values (no TZID, no trailing Z)
+ICS_DEFAULT_TZ = os.getenv("ICS_DEFAULT_TZ", "UTC")
+# Recurring events are expanded from now until this many days ahead, at most ICS_MAX_OCCURRENCES each
+ICS_RRULE_HORIZON_DAYS = int(os.getenv("ICS_RRULE_HORIZON_DAYS", "90"))
+ICS_MAX_OCCURRENCES = int(os.getenv("ICS_MAX_OCCURRENCES", "20"))
+# Larger calendars (whole exported calendars rather than invites) stop after this many VEVENTs
+ICS_MAX_EVENTS = int(os.getenv("ICS_MAX_EVENTS", "50"))
+
+_UTC = _dt.timezone.utc
+_WANTED = {"SUMMARY", "DTSTART", "LOCATION", "RRULE"}
+# Anything that changes which occurrences exist needs the full object model
+_COMPLEX = {"RDATE", "EXDATE", "EXRULE", "RECURRENCE-ID"}
+
+
+class _NeedsFullParse(Exception):
+    pass
+
+
+def _unfold(ics_text: str) -> Iterator[str]:
+    """Logical content lines: RFC 5545 continuation lines (leading space/tab) joined, lazily."""
+    current = None
+    for line in ics_text.splitlines():
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _split(line: str) -> Tuple[str, Dict[str, str], str]:
+    """Content line to (NAME, {PARAM: value}, value), e.g. DTSTART;TZID=Europe/Paris:20261204T190000."""
+    head, _, value = line.partition(":")
+    if '"' in head:
+        # A quoted parameter value (ALTREP="http://...", CN="Doe; John") may hold ":" and ";"
+        name, params, value = _split_quoted(line)
+    else:
+        name, *params = head.split(";")
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition("=")
+        parsed[key.upper()] = val.strip('"')
+    return name.upper(), parsed, value
+
+
+def _split_quoted(line: str) -> Tuple[str, List[str], str]:
+    """(name, ["KEY=value", ...], value), taking ";" and ":" as separators only outside double quotes."""
+    fields = []
+    start = 0
+    quoted = False
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == ";":
+            fields.append(line[start:i])
+            start = i + 1
+        elif char == ":":
+            fields.append(line[start:i])
+            return fields[0], fields[1:], line[i + 1:]
+    fields.append(line[start:])
+    return fields[0], fields[1:], ""
+
+
+_ESCAPE = re.compile(r"\\([\\;,nN])")
+
+
+def _unescape(value: str) -> str:
+    return _ESCAPE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _zone(tzid: Optional[str]) -> _dt.tzinfo:
+    name = tzid or ICS_DEFAULT_TZ
+    if name.upper() in ("UTC", "Z", "GMT"):
+        return _UTC
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        # Outlook's "W. Europe Standard Time" and custom VTIMEZONEs: let icalendar resolve it
+        raise _NeedsFullParse(name)
+
+
+def _parse_dtstart(value: str, params: Dict[str, str]):
+    """A date (all-day) or an aware datetime in the event's own timezone."""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return _dt.datetime.strptime(value, "%Y%m%d").date()
+    if value.endswith("Z"):
+        return _dt.datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=_UTC)
+    return _dt.datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=_zone(params.get("TZID")))
+
+
+def scan_vevents(ics_text: str) -> List[Dict[str, Any]]:
+    """Raw VEVENT fields from one pass over the lines, without building the icalendar tree.
+
+    Raises _NeedsFullParse for what the scanner does not model (unknown TZIDs,
+    RDATE/EXDATE/RECURRENCE-ID).
+    """
+    events: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    nested = 0  # VALARM etc. inside a VEVENT
+    for line in _unfold(ics_text):
+        if not line:
+            continue
+        name, params, value = _split(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT":
+                current = {}
+            elif current is not None:
+                nested += 1
+        elif name == "END":
+            if current is not None and nested:
+                nested -= 1
+            elif current is not None and value.upper() == "VEVENT":
+                events.append(current)
+                current = None
+                if len(events) >= ICS_MAX_EVENTS:
+                    break
+        elif current is not None and not nested:
+            if name in _COMPLEX:
+                raise _NeedsFullParse(name)
+            if name in _WANTED and name not in current:
+                current[name] = _parse_dtstart(value, params) if name == "DTSTART" else value
+    return [
+        {
+            "summary": _unescape(raw["SUMMARY"]) if raw.get("SUMMARY") else None,
+            "location": _unescape(raw["LOCATION"]) if raw.get("LOCATION") else None,
+            "dtstart": raw.get("DTSTART"),
+            "rrule": raw.get("RRULE"),
+            "exdates": [],
+        }
+        for raw in events
+    ]
+
+
+def _full_parse(ics_text: str) -> List[Dict[str, Any]]:
+    """Same shape as scan_vevents, through icalendar (VTIMEZONE definitions, EXDATE, ...)."""
+    from icalendar import Calendar
+
+    events = []
+    for component in Calendar.from_ical(ics_text).walk("VEVENT"):
+        if component.get("recurrence-id") is not None:
+            continue  # an override of one occurrence; the master event already covers it
+        dtstart = component.get("dtstart")
+        start = dtstart.dt if dtstart else None
+        if isinstance(start, _dt.datetime) and start.tzinfo is None:
+            start = start.replace(tzinfo=_zone(None))
+        rrule = component.get("rrule")
+        exdates = []
+        exdate = component.get("exdate")
+        # One vDDDLists per EXDATE line, or a list of them when there are several lines
+        for entry in (exdate if isinstance(exdate, list) else [exdate] if exdate else []):
+            exdates.extend(d.dt for d in entry.dts)
+        events.append({
+            "summary": str(component.get("summary")) if component.get("summary") else None,
+            "location": str(component.get("location")) if component.get("location") else None,
+            "dtstart": start,
+            "rrule": rrule.to_ical().decode() if rrule else None,
+            "exdates": exdates,
+        })
+        if len(events) >= ICS_MAX_EVENTS:
+            break
+    return events
+
+
+def _occurrences(event: Dict[str, Any], now: _dt.datetime) -> Iterator[Any]:
+    """Starts of `event` inside [now, now + horizon), computed lazily from its RRULE."""
+    start = event["dtstart"]
+    all_day = not isinstance(start, _dt.datetime)
+    anchor = _dt.datetime.combine(start, _dt.time()) if all_day else start
+    rules = rruleset()
+    # Expanded in the event's own timezone so DST shifts keep the wall-clock time
+    rules.rrule(rrulestr(event["rrule"], dtstart=anchor, ignoretz=all_day))
+    for exdate in event["exdates"]:
+        rules.exdate(exdate if isinstance(exdate, _dt.datetime) else _dt.datetime.combine(exdate, _dt.time()))
+    window_start = now.replace(tzinfo=None) if all_day else now
+    window_end = window_start + _dt.timedelta(days=ICS_RRULE_HORIZON_DAYS)
+    if all_day:
+        window_start = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    for occurrence in islice(rules.xafter(window_start, inc=True), ICS_MAX_OCCURRENCES):
+        if occurrence >= window_end:
+            return
+        yield occurrence.date() if all_day else occurrence
+
+
+def _to_result(summary: Optional[str], location: Optional[str], start: Any, recurring: bool) -> Dict[str, Any]:
+    date_str = time_str = None
+    if isinstance(start, _dt.datetime):
+        start = start.astimezone(_UTC)
+        date_str, time_str = start.strftime("%Y-%m-%d"), start.strftime("%H:%M")
+    elif start is not None:
+        date_str = start.strftime("%Y-%m-%d")
+    return {
+        "event": summary,
+        "event_name": summary,
+        "date": date_str,
+        "time": time_str,
+        "venue": location,
+        "source": "ics",
+        "confidence": 1.0 if date_str and (time_str or location) else 0.9,
+        "recurring": recurring,
+    }
+
+
+def extract_ics_events(ics_text: str, now: Optional[_dt.datetime] = None) -> List[Dict[str, Any]]:
+    """Every event in an ICS attachment as result dicts, with date/time in UTC.
+
+    Recurring events contribute their occurrences within ICS_RRULE_HORIZON_DAYS
+    from `now` (or their first start if none falls inside). Uses the line scanner
+    and falls back to icalendar for what it cannot handle.
+    """
+    now = now or _dt.datetime.now(_UTC)
+    try:
+        events = scan_vevents(ics_text)
+    except (_NeedsFullParse, ValueError):
+        try:
+            events = _full_parse(ics_text)
+        except Exception:
+            return []
+    results = []
+    for event in events:
+        if not any((event["summary"], event["dtstart"], event["location"])):
+            continue
+        starts = []
+        if event["rrule"] and event["dtstart"] is not None:
+            try:
+                starts = list(_occurrences(event, now))
+            except (ValueError, TypeError):
+                starts = []
+        for start in starts or [event["dtstart"]]:
+            results.append(_to_result(event["summary"], event["location"], start, bool(event["rrule"])))
+    return results
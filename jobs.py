@@ -0,0 +1,104 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class Job:
+    """A background run whose events become visible as soon as they are published."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = "queued"
+        self.events: List[Dict[str, Any]] = []
+        self.summary: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def publish(self, event: Dict[str, Any]):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def _finish(self, status: str, summary: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._cond:
+            self.status = status
+            self.summary = summary
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def snapshot(self, since: int = 0) -> Dict[str, Any]:
+        with self._cond:
+            since = max(0, since)
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "events": list(self.events[since:]),
+                "next": len(self.events),
+                "summary": self.summary,
+                "error": self.error,
+            }
+
+    def iter_events(self, poll_seconds: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """Yield every event (already published or future) until the job finishes."""
+        sent = 0
+        while True:
+            with self._cond:
+                while sent >= len(self.events) and not self.done:
+                    self._cond.wait(timeout=poll_seconds)
+                pending = self.events[sent:]
+                finished = self.done
+            for event in pending:
+                yield event
+            sent += len(pending)
+            if finished and sent >= len(self.events):
+                return
+
+
+class JobRegistry:
+    """Runs `fn(*args, emit)` jobs on a thread pool and keeps them around for `retention_seconds`.
+
+    Jobs live in this process only; with several gunicorn workers, clients must
+    poll the worker that accepted the job (or run a single worker for async mode).
+    """
+
+    def __init__(self, max_workers: int = 4, retention_seconds: float = 3600):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Optional[Dict[str, Any]]], *args: Any) -> Job:
+        job = Job(uuid.uuid4().hex)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[..., Optional[Dict[str, Any]]], args: tuple):
+        job.status = "running"
+        try:
+            summary = fn(*args, job.publish)
+            job._finish("done", summary=summary)
+        except Exception as e:
+            traceback.print_exc()
+            job._finish("failed", error=str(e))
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -1,58 +1,340 @@
 import os
+import re
 import json
-from typing import Optional, Dict
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 import google.generativeai as genai
 
+from cache_utils import cache_from_env
+from db_utils import DB_NAME
+from extraction_pool import Deadline, STAGE_LIMITS
+from hf_client import CallMetrics
+
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GEMINI_MODEL_ID = os.getenv("GEMINI_MODEL_ID", "gemini-1.5-flash")
+SYSTEM_INSTRUCTION = (
+    "You extract event info from emails. "
+    "Output ONLY valid JSON: "
+    '{"event_name": string|null, "date": "YYYY-MM-DD"|null, "time": "HH:MM"|null, "venue": string|null}. '
+    "No extra text."
+)
+BATCH_SYSTEM_INSTRUCTION = (
+    "You extract event info from several emails at once. "
+    "Output ONLY a valid JSON array with one object per email: "
+    '[{"id": string, "event_name": string|null, "date": "YYYY-MM-DD"|null, "time": "HH:MM"|null, "venue": string|null}]. '
+    "Copy each email's id exactly. No extra text."
+)
+# One batched call replaces several 4 s single calls, so it gets a larger timeout of its own
+LLM_BATCH_TIMEOUT_SECONDS = float(os.getenv("LLM_BATCH_TIMEOUT_SECONDS", "20"))
+
+# Responses keyed by a hash of (model, instructions, prompt); newsletters and invites sent to
+# several users are answered once. Stored in the events DB by default so every worker shares it
+# (LLM_CACHE_DB="" keeps it in memory only). Unusable answers are cached as negatives.
+LLM_CACHE = cache_from_env(
+    "gemini", "LLM_CACHE", ttl_seconds=30 * 24 * 3600, negative_ttl_seconds=24 * 3600, db_path=DB_NAME
+)
+
+# Latency and outcome of every Gemini call (short_circuited = skipped because the request budget ran out)
+LLM_METRICS = CallMetrics()
+
+
+# genai's async client (grpc.aio) stays bound to the loop of its first call, so every
+# coroutine runs on one long-lived loop in a daemon thread instead of a fresh asyncio.run()
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_THREAD: Optional[threading.Thread] = None
+_LOOP_LOCK = threading.Lock()
+# LLM_CONCURRENCY slots shared by every request and job of this process, created with the loop
+_SLOTS: Optional[asyncio.Semaphore] = None
+
+
+def _run(coro):
+    """Run `coro` on the shared Gemini loop and block this thread until it finishes."""
+    global _LOOP, _LOOP_THREAD, _SLOTS
+    with _LOOP_LOCK:
+        # A forked child inherits _LOOP but not the thread running it
+        if _LOOP_THREAD is None or not _LOOP_THREAD.is_alive():
+            _LOOP = asyncio.new_event_loop()
+            limit = STAGE_LIMITS.get("llm") or 0
+            _SLOTS = asyncio.Semaphore(limit) if limit > 0 else None
+            _LOOP_THREAD = threading.Thread(target=_LOOP.run_forever, name="gemini-loop", daemon=True)
+            _LOOP_THREAD.start()
+        loop = _LOOP
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
 
 
-def _configure_model():
+async def _in_slot(coro):
+    """Await `coro` holding one of the process-wide LLM slots (no limit when LLM_CONCURRENCY=0)."""
+    if _SLOTS is None:
+        return await coro
+    async with _SLOTS:
+        return await coro
+
+
+def _configure_model(system_instruction: str):
     if not GOOGLE_API_KEY:
         return None
     genai.configure(api_key=GOOGLE_API_KEY)
     return genai.GenerativeModel(
         model_name=GEMINI_MODEL_ID,
-        system_instruction=(
-            "You extract event info from emails. "
-            "Output ONLY valid JSON: "
-            '{"event_name": string|null, "date": "YYYY-MM-DD"|null, "time": "HH:MM"|null, "venue": string|null}. '
-            "No extra text."
-        ),
+        system_instruction=system_instruction,
     )
 
 
-_MODEL = _configure_model()
+_MODEL = _configure_model(SYSTEM_INSTRUCTION)
+_BATCH_MODEL = _configure_model(BATCH_SYSTEM_INSTRUCTION)
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_TIME_RE = re.compile(r"\d{1,2}:\d{2}")
+_GENERATION_CONFIG = {
+    "temperature": 0,
+    "response_mime_type": "application/json",
+}
+
+
+def _prompt(subject: str, cleaned_text: str) -> str:
+    return f"Subject: {subject or ''}\n\nBody:\n{(cleaned_text or '')[:6000]}"
+
+
+def _cache_key(prompt: str) -> str:
+    digest = hashlib.sha256()
+    for part in (GEMINI_MODEL_ID, SYSTEM_INSTRUCTION, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
 
+def _budget(timeout_seconds: float, deadline: Optional[Deadline]) -> Optional[float]:
+    """Timeout for a call started now, or None when the request's LLM budget is spent."""
+    if deadline is None:
+        return timeout_seconds
+    if deadline.expired():
+        LLM_METRICS.observe("short_circuited")
+        return None
+    return deadline.clamp(timeout_seconds)
+
+
+def _observe(start: float, error: Optional[Exception] = None):
+    if error is None:
+        outcome = "success"
+    else:
+        name = type(error).__name__.lower()
+        outcome = "timeout" if "timeout" in name or "deadline" in name else "error"
+    LLM_METRICS.observe(outcome, (time.perf_counter() - start) * 1000)
+
+
+def _store(key: str, result: Optional[Dict[str, object]]) -> Dict[str, object]:
+    LLM_CACHE.set(key, result)
+    return dict(result) if result else {}
+
+
+def extract_with_gemini(
+    subject: str, cleaned_text: str, timeout_seconds: float = 4.0, deadline: Optional[Deadline] = None
+) -> Optional[Dict[str, object]]:
+    """Gemini's fields for one email; {} if it answered without usable fields.
 
-def extract_with_gemini(subject: str, cleaned_text: str, timeout_seconds: float = 4.0) -> Optional[Dict[str, object]]:
+    None means there was no answer (call failed, timed out or skipped for the budget),
+    so the email may still turn out to be an event on a later run.
+    """
     if not _MODEL:
+        return {}  # not configured: as final as an empty answer
+    prompt = _prompt(subject, cleaned_text)
+    key = _cache_key(prompt)
+    hit, cached = LLM_CACHE.lookup(key)
+    if hit:
+        return dict(cached) if cached else {}
+    timeout = _budget(timeout_seconds, deadline)
+    if timeout is None:
         return None
-    prompt = f"Subject: {subject or ''}\n\nBody:\n{(cleaned_text or '')[:6000]}"
+    start = time.perf_counter()
     try:
         resp = _MODEL.generate_content(
             prompt,
-            generation_config={
-                "temperature": 0,
-                "response_mime_type": "application/json",
-            },
-            request_options={"timeout": timeout_seconds},
+            generation_config=_GENERATION_CONFIG,
+            request_options={"timeout": timeout},
+        )
+    except Exception as e:
+        # Timeouts and API errors say nothing about the content; do not cache them
+        _observe(start, e)
+        return None
+    _observe(start)
+    return _store(key, _parse_response(resp))
+
+
+async def extract_with_gemini_async(
+    subject: str, cleaned_text: str, timeout_seconds: float = 4.0, deadline: Optional[Deadline] = None
+) -> Optional[Dict[str, object]]:
+    """extract_with_gemini on the event loop, so many calls can wait on Gemini at once."""
+    if not _MODEL:
+        return {}
+    prompt = _prompt(subject, cleaned_text)
+    key = _cache_key(prompt)
+    hit, cached = LLM_CACHE.lookup(key)
+    if hit:
+        return dict(cached) if cached else {}
+    timeout = _budget(timeout_seconds, deadline)
+    if timeout is None:
+        return None
+    start = time.perf_counter()
+    try:
+        resp = await asyncio.wait_for(
+            _MODEL.generate_content_async(
+                prompt,
+                generation_config=_GENERATION_CONFIG,
+                request_options={"timeout": timeout},
+            ),
+            timeout,
         )
+    except Exception as e:
+        _observe(start, e)
+        return None
+    _observe(start)
+    return _store(key, _parse_response(resp))
+
+
+def _to_result(data: Dict[str, Any]) -> Dict[str, object]:
+    return {
+        "event_name": data.get("event_name"),
+        "date": data.get("date"),
+        "time": data.get("time"),
+        "venue": data.get("venue"),
+        "source": "gemini",
+        "confidence": 0.8,
+    }
+
+
+def _parse_response(resp) -> Optional[Dict[str, object]]:
+    try:
         text = (resp.text or "").strip().strip("`")
         data = json.loads(text)
         if not isinstance(data, dict):
             return None
-        return {
-            "event_name": data.get("event_name"),
-            "date": data.get("date"),
-            "time": data.get("time"),
-            "venue": data.get("venue"),
-            "source": "gemini",
-            "confidence": 0.8,
-        }
+        return _to_result(data)
     except Exception:
         return None
 
 
+def _valid_element(data: Any) -> bool:
+    """One element of a batched answer must match the single-email schema exactly."""
+    if not isinstance(data, dict) or not isinstance(data.get("id"), str):
+        return False
+    for key in ("event_name", "venue"):
+        if data.get(key) is not None and not isinstance(data.get(key), str):
+            return False
+    for key, pattern in (("date", _DATE_RE), ("time", _TIME_RE)):
+        value = data.get(key)
+        if value is not None and not (isinstance(value, str) and pattern.fullmatch(value)):
+            return False
+    return True
+
+
+def _parse_batch_response(resp, ids: List[str]) -> Dict[str, Dict[str, object]]:
+    try:
+        data = json.loads((resp.text or "").strip().strip("`"))
+    except Exception:
+        return {}
+    if not isinstance(data, list):
+        return {}
+    wanted = set(ids)
+    parsed: Dict[str, Dict[str, object]] = {}
+    for element in data:
+        if _valid_element(element) and element["id"] in wanted and element["id"] not in parsed:
+            parsed[element["id"]] = _to_result(element)
+    return parsed
+
+
+def extract_with_gemini_batch(
+    items: List[Tuple[str, str, str]],
+    timeout_seconds: float = LLM_BATCH_TIMEOUT_SECONDS,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Optional[Dict[str, object]]]:
+    """Extract several (id, subject, cleaned_text) emails with one Gemini call.
+
+    Cached emails are answered from LLM_CACHE; the rest share one prompt that asks for
+    a JSON array keyed by id. Any email whose element is missing or fails the schema
+    check (or the whole call, if it fails) falls back to a single-email call.
+    Values follow extract_with_gemini: {} for an empty answer, None for no answer.
+    """
+    return _run(_in_slot(extract_with_gemini_batch_async(items, timeout_seconds, deadline)))
+
+
+async def extract_with_gemini_batch_async(
+    items: List[Tuple[str, str, str]],
+    timeout_seconds: float = LLM_BATCH_TIMEOUT_SECONDS,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Optional[Dict[str, object]]]:
+    if not items:
+        return {}
+    if not _MODEL:
+        return {item_id: {} for item_id, _, _ in items}
+    results: Dict[str, Optional[Dict[str, object]]] = {}
+    todo = []
+    for item_id, subject, cleaned_text in items:
+        prompt = _prompt(subject, cleaned_text)
+        hit, cached = LLM_CACHE.lookup(_cache_key(prompt))
+        if hit:
+            results[item_id] = dict(cached) if cached else {}
+        else:
+            todo.append((item_id, subject, cleaned_text, prompt))
+
+    answers: Dict[str, Dict[str, object]] = {}
+    if len(todo) > 1 and _BATCH_MODEL:
+        timeout = _budget(timeout_seconds, deadline)
+        if timeout is None:
+            return results
+        batch_prompt = "\n\n".join(f'<email id="{item_id}">\n{prompt}\n</email>' for item_id, _, _, prompt in todo)
+        start = time.perf_counter()
+        try:
+            resp = await asyncio.wait_for(
+                _BATCH_MODEL.generate_content_async(
+                    batch_prompt,
+                    generation_config=_GENERATION_CONFIG,
+                    request_options={"timeout": timeout},
+                ),
+                timeout,
+            )
+            _observe(start)
+            answers = _parse_batch_response(resp, [item[0] for item in todo])
+        except Exception as e:
+            _observe(start, e)
+            print(f"⚠️ Gemini batch of {len(todo)} failed, retrying per email: {e}")
+
+    # Fallbacks run one after another so a caller's concurrency limit also bounds them
+    for item_id, subject, cleaned_text, prompt in todo:
+        if item_id in answers:
+            results[item_id] = _store(_cache_key(prompt), answers[item_id])
+        else:
+            results[item_id] = await extract_with_gemini_async(subject, cleaned_text, deadline=deadline)
+    return results
+
+
+def run_gemini_batches(
+    chunks: List[List[Tuple[str, str, str]]], deadline: Optional[Deadline] = None
+) -> Dict[str, Optional[Dict[str, object]]]:
+    """Run extract_with_gemini_batch for every chunk concurrently.
+
+    At most LLM_CONCURRENCY calls are in flight across all requests and jobs of the process.
+    Chunks that have not started when `deadline` passes are skipped (no entry for their ids).
+    """
+    return _run(_run_batches(chunks, deadline))
+
+
+async def _run_batches(chunks, deadline):
+    results: Dict[str, Optional[Dict[str, object]]] = {}
+    parts = await asyncio.gather(
+        *(_in_slot(extract_with_gemini_batch_async(chunk, deadline=deadline)) for chunk in chunks)
+    )
+    for part in parts:
+        results.update(part)
+    return results
+
+
+def cache_stats() -> Dict[str, object]:
+    return LLM_CACHE.stats()
+
+
+def call_stats() -> Dict[str, object]:
+    return LLM_METRICS.stats()
@@ -0,0 +1,172 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Seconds; Gmail/LLM stages sit in the upper buckets, regex stages in the lower ones
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, row in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (math.inf,), row):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == math.inf else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative:g}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {row[-1]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative:g}")
+        return lines
+
+
+# Process-local, like the caches: each worker exposes its own /metrics
+STAGE_SECONDS = Histogram("extraction_stage_seconds", "Time spent in each pipeline stage.", ["stage"])
+SOURCE_TOTAL = Counter("extraction_source_total", "Extraction results by the path that produced them.", ["source"])
+SHORTCUT_TOTAL = Counter("mailbox_shortcut_total", "Messages resolved without a full download and extraction.", ["via"])
+
+
+class Profile:
+    """Per-request stage breakdown: total seconds and call count for each stage."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {"ms": round(total * 1000, 2), "calls": int(calls)}
+                for stage, (total, calls) in sorted(self.stages.items(), key=lambda kv: -kv[1][0])
+            }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; stages on worker threads overlap, so durations can exceed `total`."""
+        parts = [f'{stage};dur={v["ms"]};desc="{v["calls"]} calls"' for stage, v in self.breakdown().items()]
+        parts.append(f"total;dur={round((time.perf_counter() - self.started) * 1000, 2)}")
+        return ", ".join(parts)
+
+
+_PROFILE: "contextvars.ContextVar[Optional[Profile]]" = contextvars.ContextVar("extraction_profile", default=None)
+
+
+@contextmanager
+def use_profile(profile: Optional[Profile]) -> Iterator[Optional[Profile]]:
+    """Make `profile` the active request profile inside the block (no-op for None)."""
+    if profile is None:
+        yield None
+        return
+    token = _PROFILE.set(profile)
+    try:
+        yield profile
+    finally:
+        _PROFILE.reset(token)
+
+
+def profile_request(enabled: bool = True):
+    """Collect stage timings for the code run inside the block (yields None when not enabled)."""
+    return use_profile(Profile() if enabled else None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the block's duration in the stage histogram and in the active request profile."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        profile = _PROFILE.get()
+        if profile is not None:
+            profile.add(stage, elapsed)
+
+
+def count_source(source: Optional[str]):
+    SOURCE_TOTAL.inc(source=source or "none")
+
+
+def render_stats(name: str, documentation: str, rows: List[Tuple[Dict[str, str], Dict[str, Any]]]) -> List[str]:
+    """Numeric fields of stats() dicts (caches, HF client, ...) as one gauge family `<name>{..., field=...}`."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for labels, stats in rows:
+        names = tuple(labels) + ("field",)
+        for field, value in sorted(stats.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{name}{_labels(names, tuple(labels.values()) + (field,))} {value:g}")
+    return lines
+
+
+def render(*extra: List[str]) -> str:
+    lines: List[str] = []
+    for metric in (STAGE_SECONDS, SOURCE_TOTAL, SHORTCUT_TOTAL):
+        lines.extend(metric.render())
+    for block in extra:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,108 @@
+import base64
+import binascii
+import os
+from typing import Any, Dict, List, Optional
+
+from html_text import html_to_text
+
+# Decoded bytes kept from one text/plain or text/html part; the rest is cut off before decoding
+MIME_MAX_TEXT_BYTES = int(os.getenv("MIME_MAX_TEXT_BYTES", str(256 * 1024)))
+# Larger calendar parts are skipped (a truncated ICS is useless)
+MIME_MAX_CALENDAR_BYTES = int(os.getenv("MIME_MAX_CALENDAR_BYTES", str(1024 * 1024)))
+# Bounds on the payload tree walked per message
+MIME_MAX_DEPTH = int(os.getenv("MIME_MAX_DEPTH", "16"))
+MIME_MAX_PARTS = int(os.getenv("MIME_MAX_PARTS", "256"))
+
+
+def _decode(data: str, max_bytes: Optional[int] = None) -> str:
+    """base64url `data` to text, decoding at most `max_bytes` bytes."""
+    if max_bytes is not None and len(data) > (max_bytes // 3 + 1) * 4:
+        # Cut on a 4-character boundary so only the kept prefix is ever decoded
+        data = data[:(max_bytes // 3) * 4]
+    if len(data) % 4:
+        # Gmail sometimes drops the padding
+        data += "=" * (-len(data) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(data)
+    except (binascii.Error, ValueError):
+        return ""
+    return raw.decode("utf-8", errors="ignore")
+
+
+def _is_attachment(part: Dict[str, Any]) -> bool:
+    return bool(part.get("filename")) or "attachmentId" in (part.get("body") or {})
+
+
+class PayloadParts:
+    """Text and calendar candidates of a Gmail payload, found in one walk and decoded on demand."""
+
+    __slots__ = ("plain", "html", "other", "calendar_part", "_text", "_calendar")
+
+    def __init__(self):
+        self.plain: Optional[Dict[str, Any]] = None
+        self.html: Optional[Dict[str, Any]] = None
+        self.other: Optional[Dict[str, Any]] = None
+        self.calendar_part: Optional[Dict[str, Any]] = None
+        self._text: Optional[str] = None
+        self._calendar: Optional[str] = None
+
+    def text(self) -> str:
+        """First text/plain part, else the first text/html part as text, else any other inline body."""
+        if self._text is None:
+            if self.plain is not None:
+                self._text = _decode(self.plain["body"]["data"], MIME_MAX_TEXT_BYTES)
+            elif self.html is not None:
+                self._text = html_to_text(_decode(self.html["body"]["data"], MIME_MAX_TEXT_BYTES))
+            elif self.other is not None:
+                self._text = _decode(self.other["body"]["data"], MIME_MAX_TEXT_BYTES)
+            else:
+                self._text = ""
+        return self._text
+
+    def calendar(self) -> str:
+        """Raw ICS text of the first inline calendar part ("" if none or over MIME_MAX_CALENDAR_BYTES)."""
+        if self._calendar is None:
+            self._calendar = ""
+            if self.calendar_part is not None:
+                body = self.calendar_part["body"]
+                size = int(body.get("size") or len(body["data"]) * 3 // 4)
+                if size <= MIME_MAX_CALENDAR_BYTES:
+                    self._calendar = _decode(body["data"])
+                else:
+                    print(f"⚠️ Skipping {size}-byte calendar part (MIME_MAX_CALENDAR_BYTES={MIME_MAX_CALENDAR_BYTES})")
+        return self._calendar
+
+
+def scan_payload(payload: Optional[Dict[str, Any]]) -> PayloadParts:
+    """Walk the payload tree once, depth-first in part order, without decoding anything.
+
+    Attachments (a filename or an attachmentId) are never text candidates; an
+    inline calendar part is used even when it has a filename, since invites are
+    often sent as invite.ics. Walks at most MIME_MAX_PARTS parts, MIME_MAX_DEPTH deep.
+    """
+    found = PayloadParts()
+    if not payload:
+        return found
+    stack: List[tuple] = [(payload, 0)]
+    seen = 0
+    while stack and seen < MIME_MAX_PARTS:
+        part, depth = stack.pop()
+        seen += 1
+        body = part.get("body")
+        if body and body.get("data"):
+            mime_type = part.get("mimeType") or ""
+            if mime_type == "text/plain" or mime_type == "text/html":
+                if not _is_attachment(part):
+                    if mime_type == "text/plain":
+                        found.plain = found.plain or part
+                    else:
+                        found.html = found.html or part
+            elif mime_type.lower().endswith("calendar"):
+                found.calendar_part = found.calendar_part or part
+            elif not _is_attachment(part):
+                found.other = found.other or part
+        children = part.get("parts")
+        if children and depth < MIME_MAX_DEPTH:
+            # Reversed so the first child is popped (and preferred) first
+            stack.extend([(child, depth + 1) for child in reversed(children)])
+    return found
@@ -0,0 +1,86 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from hf_client import HF_MODEL_ID
+
+# "api" calls the Hugging Face Inference API (hf_client); "local" runs the model in-process on CPU
+# and needs transformers + torch (or optimum[onnxruntime]) installed; without them the API is used
+NER_BACKEND = os.getenv("NER_BACKEND", "api").lower()
+# Optional local directory with the model (or an exported / quantized ONNX model); defaults to HF_MODEL_ID
+NER_LOCAL_MODEL_PATH = os.getenv("NER_LOCAL_MODEL_PATH") or HF_MODEL_ID
+# Run through onnxruntime (requires optimum[onnxruntime]); exports the model on first load if needed
+NER_LOCAL_ONNX = os.getenv("NER_LOCAL_ONNX", "false").lower() == "true"
+NER_LOCAL_BATCH_SIZE = int(os.getenv("NER_LOCAL_BATCH_SIZE", "16"))
+# DistilBERT sees at most 512 tokens; longer text is cut rather than failing the whole batch
+NER_LOCAL_MAX_CHARS = int(os.getenv("NER_LOCAL_MAX_CHARS", "2000"))
+
+_PIPELINE = None
+_LOAD_FAILED = False
+_LOAD_LOCK = threading.Lock()
+# Pipelines are not documented as thread-safe; batches from different workers run one at a time
+_INFER_LOCK = threading.Lock()
+
+
+def _build_pipeline():
+    from transformers import AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(NER_LOCAL_MODEL_PATH)
+    if NER_LOCAL_ONNX:
+        from optimum.onnxruntime import ORTModelForTokenClassification
+
+        has_onnx = os.path.isdir(NER_LOCAL_MODEL_PATH) and any(
+            f.endswith(".onnx") for f in os.listdir(NER_LOCAL_MODEL_PATH)
+        )
+        model = ORTModelForTokenClassification.from_pretrained(NER_LOCAL_MODEL_PATH, export=not has_onnx)
+    else:
+        from transformers import AutoModelForTokenClassification
+
+        model = AutoModelForTokenClassification.from_pretrained(NER_LOCAL_MODEL_PATH)
+    # aggregation_strategy="simple" yields entity_group/word/start/end/score, the Inference API format
+    return pipeline("token-classification", model=model, tokenizer=tokenizer, aggregation_strategy="simple", device=-1)
+
+
+def load() -> bool:
+    """Load the local model once; False (and a warning) when it cannot be used."""
+    global _PIPELINE, _LOAD_FAILED
+    if _PIPELINE is not None or _LOAD_FAILED:
+        return _PIPELINE is not None
+    with _LOAD_LOCK:
+        if _PIPELINE is None and not _LOAD_FAILED:
+            try:
+                _PIPELINE = _build_pipeline()
+                print(f"🧠 Local NER model loaded: {NER_LOCAL_MODEL_PATH} ({'onnx' if NER_LOCAL_ONNX else 'torch'})")
+            except Exception as e:
+                _LOAD_FAILED = True
+                print(f"⚠️ Local NER unavailable, using the Inference API instead: {e}")
+    return _PIPELINE is not None
+
+
+def enabled() -> bool:
+    return NER_BACKEND == "local" and load()
+
+
+def _to_builtin(entity: Dict[str, Any]) -> Dict[str, Any]:
+    # Scores come back as numpy floats; keep results JSON-serializable like the API's
+    return {
+        "entity_group": entity.get("entity_group"),
+        "score": float(entity.get("score", 0.0)),
+        "word": entity.get("word", ""),
+        "start": entity.get("start"),
+        "end": entity.get("end"),
+    }
+
+
+def predict(texts: List[str]) -> List[Optional[List[Dict[str, Any]]]]:
+    """Token classification for `texts` in one batched pass; None per text if inference fails."""
+    if not texts or not load():
+        return [None] * len(texts)
+    inputs = [(t or "")[:NER_LOCAL_MAX_CHARS] for t in texts]
+    try:
+        with _INFER_LOCK:
+            outputs = _PIPELINE(inputs, batch_size=NER_LOCAL_BATCH_SIZE)
+    except Exception as e:
+        print(f"⚠️ Local NER failed: {e}")
+        return [None] * len(texts)
+    return [[_to_builtin(e) for e in entities] for entities in outputs]